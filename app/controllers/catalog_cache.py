@@ -0,0 +1,174 @@
+import sqlite3
+from datetime import datetime, timedelta
+from threading import Thread, local
+from pymongo import errors
+from app.controllers.mongo_controller import MongoController
+from app.models.catalog import CatalogPage
+from app.models.song import Song
+import config
+
+
+class CatalogCache:
+
+    # Constants
+    CONST_BATCH_SIZE = 1000
+    CONST_LOOKUP_SIZE = 400  # (title, artist) pairs per query, two variables each.
+    CONST_KEY_HIGH_WATER_MARK = "high_water_mark"
+    CONST_KEY_FULL_REFRESH = "full_refresh"
+    CONST_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS songs (id TEXT PRIMARY KEY, title TEXT, artist TEXT, youtube TEXT);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE INDEX IF NOT EXISTS songs_title_artist ON songs (title, artist);
+    """
+
+    def __init__(self, mongo, path=None, full_refresh_age=None):
+        # a read-through copy of the songs collection in SQLite; reads never wait on Mongo.
+        self.mongo = mongo
+        self.path = path or config.CATALOG_SNAPSHOT_PATH
+        if full_refresh_age is None:
+            full_refresh_age = timedelta(hours=config.CATALOG_FULL_REFRESH_HOURS)
+        self.full_refresh_age = full_refresh_age
+        self.local = local()
+        self.local.connection = self.connect()
+
+    @classmethod
+    def load(cls, mongo, path=None):
+        cache = cls(mongo, path)
+        if len(cache) == 0:
+            cache.refresh()  # first start on this kiosk, nothing to show until the catalog is copied.
+        else:
+            cache.refresh_in_background()
+        return cache
+
+    @property
+    def connection(self):
+        # SQLite connections stay on the thread that made them, so each thread reading the snapshot gets its own;
+        # the server resolves saved playlists on worker threads.
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = self.connect()
+        return connection
+
+    def connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")  # lets a refresh write while menus keep reading.
+        connection.executescript(self.CONST_SCHEMA)
+        return connection
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+
+    def iter_songs(self, batch_size=CONST_BATCH_SIZE):
+        for row in self.iter_rows(batch_size):
+            yield Song(*row[1:])
+
+    def iter_rows(self, batch_size=CONST_BATCH_SIZE):
+        # (id, title, artist, youtube) in id order.
+        rows = self.connection.execute("SELECT id, title, artist, youtube FROM songs ORDER BY id")
+        while True:
+            batch = rows.fetchmany(batch_size)
+            if not batch:
+                break
+            for row in batch:
+                yield row
+
+    def get_page(self, token=None, page_size=CONST_BATCH_SIZE, offset=0):
+        # ids are ObjectId hex strings, so tokens are the same ones MongoController.get_page hands out.
+        rows = self.connection.execute("SELECT id, title, artist, youtube FROM songs WHERE id > ? ORDER BY id LIMIT ?",
+                                       (token or "", page_size + 1)).fetchall()
+        next_token = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_token = rows[-1][0]
+
+        return CatalogPage([Song(*row[1:]) for row in rows], offset, token, next_token)
+
+    def get_songs(self, keys):
+        # resolves (title, artist) keys from the snapshot, so loading a playlist costs no song lookups in Mongo.
+        keys = list(keys)
+        unique = list(set(keys))
+        found = {}
+        for start in range(0, len(unique), self.CONST_LOOKUP_SIZE):
+            chunk = unique[start:start + self.CONST_LOOKUP_SIZE]
+            query = "SELECT title, artist, youtube FROM songs WHERE (title, artist) IN (VALUES {0})".format(
+                ", ".join(["(?, ?)"] * len(chunk)))
+            for row in self.connection.execute(query, [value for key in chunk for value in key]):
+                found[(row[0], row[1])] = Song(*row)
+
+        return [found[key] for key in keys if key in found]
+
+    def meta(self, connection, key):
+        row = connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def high_water_mark(self, connection):
+        return self.meta(connection, self.CONST_KEY_HIGH_WATER_MARK)
+
+    def full_refresh_due(self, connection):
+        last = self.meta(connection, self.CONST_KEY_FULL_REFRESH)
+        return last is None or datetime.utcnow() - last >= self.full_refresh_age
+
+    def refresh(self, full=False):
+        # pulls the songs updated since the last refresh, or the whole catalog on the first run, when full is set or
+        # when the last full refresh is older than full_refresh_age. Deleted songs are only dropped by a full refresh.
+        # Returns how many songs were added, changed or dropped; songs fetched again unchanged do not count.
+        connection = self.connect()
+        try:
+            full = full or self.full_refresh_due(connection)
+            since = None if full else self.high_water_mark(connection)
+            mark = since
+            changed = 0
+            batch = []
+
+            with connection:
+                if since is None:
+                    # ids fetched by a full refresh, every other song has been deleted from the catalog.
+                    connection.execute("CREATE TEMP TABLE seen (id TEXT PRIMARY KEY)")
+
+                for item in self.mongo.get_changed_songs(since, self.CONST_BATCH_SIZE):
+                    batch.append((str(item[MongoController.CONST_PROPERTY_ID]),
+                                  item[MongoController.CONST_PROPERTY_TITLE],
+                                  item[MongoController.CONST_PROPERTY_ARTIST],
+                                  item[MongoController.CONST_PROPERTY_YOUTUBE]))
+                    updated_at = item.get(MongoController.CONST_PROPERTY_UPDATED_AT)
+                    if updated_at is not None and (mark is None or updated_at > mark):
+                        mark = updated_at
+                    if len(batch) == self.CONST_BATCH_SIZE:
+                        changed += self.store(connection, batch, since is None)
+                changed += self.store(connection, batch, since is None)
+                if since is None:
+                    changed += connection.execute("DELETE FROM songs WHERE id NOT IN (SELECT id FROM seen)").rowcount
+
+                if mark is not None:
+                    connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                       (self.CONST_KEY_HIGH_WATER_MARK, mark.isoformat()))
+                if since is None:
+                    connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                       (self.CONST_KEY_FULL_REFRESH, datetime.utcnow().isoformat()))
+            return changed
+
+        except errors.PyMongoError as e:
+            print("Could not refresh the song catalog, using the offline copy.")
+            print(e)
+            return 0
+
+        finally:
+            connection.close()
+
+    @staticmethod
+    def store(connection, batch, full=False):
+        # the WHERE guard skips rows that are already up to date, so rowcount only counts real changes.
+        changed = connection.executemany("""
+            INSERT INTO songs (id, title, artist, youtube) VALUES (?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET title = excluded.title, artist = excluded.artist, youtube = excluded.youtube
+            WHERE (title, artist, youtube) IS NOT (excluded.title, excluded.artist, excluded.youtube)
+        """, batch).rowcount
+        if full:
+            connection.executemany("INSERT OR IGNORE INTO seen (id) VALUES (?)", [(row[0],) for row in batch])
+        del batch[:]
+        return changed
+
+    def refresh_in_background(self, full=False):
+        thread = Thread(target=self.refresh, args=(full,), daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,29 @@
+from time import sleep
+from app.controllers.catalog_cache import CatalogCache
+from app.models.catalog_segment import CatalogSegment
+import config
+
+
+class CatalogPublisher:
+
+    def __init__(self, mongo, path=None, interval=None):
+        # the one process on a host that talks to Mongo for the catalog: it keeps the SQLite snapshot current and
+        # republishes the shared segment only when a refresh added, changed or dropped a song.
+        self.cache = CatalogCache(mongo)
+        self.path = path or config.CATALOG_SEGMENT_PATH
+        self.interval = interval or config.CATALOG_PUBLISH_INTERVAL
+
+    def publish(self):
+        return CatalogSegment.write(self.path, self.cache.iter_rows())
+
+    def refresh(self):
+        # the cache runs a full refresh, which drops deleted songs, once its last one is old enough.
+        return self.cache.refresh()
+
+    def run(self, once=False):
+        self.cache.refresh()
+        print("Published {0} songs to {1}".format(self.publish(), self.path))
+        while not once:
+            sleep(self.interval)
+            if self.refresh():
+                print("Published {0} songs to {1}".format(self.publish(), self.path))
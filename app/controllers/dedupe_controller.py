@@ -0,0 +1,112 @@
+from pymongo import ASCENDING, DeleteMany, UpdateMany, UpdateOne
+from app.controllers import mongo_client
+from app.controllers.mongo_controller import MongoController
+from app.models.song_key import canonical_key
+
+
+class DedupeReport:
+
+    def __init__(self):
+        self.songs = 0
+        self.keyed = 0  # songs that were given a canonical key.
+        self.groups = 0  # canonical keys that had more than one song.
+        self.removed = 0
+        self.playlists = 0  # playlists pointed at the kept songs.
+        self.plays = 0  # play events moved onto the kept songs.
+
+
+class DedupeController:
+
+    # Constants
+    CONST_BATCH_SIZE = 1000
+
+    def __init__(self, mongo):
+        # one-off job for catalogs stored before canonical keys: keys every song, keeps the oldest song of each
+        # key, moves its duplicates' links, playlists and plays onto it, then builds the unique key index.
+        # It works on the raw database, the schema setup would only fail on the duplicates it is here to merge.
+        self.mongo = mongo
+        self.database = mongo.raw_client
+
+    def scan(self):
+        # canonical key -> songs with that key, oldest first.
+        groups = {}
+        projection = {MongoController.CONST_PROPERTY_TITLE: 1, MongoController.CONST_PROPERTY_ARTIST: 1,
+                      MongoController.CONST_PROPERTY_YOUTUBE: 1, MongoController.CONST_PROPERTY_KEY: 1}
+        songs = self.database.songs.find({}, projection).sort(MongoController.CONST_PROPERTY_ID, ASCENDING)
+        for song in songs.batch_size(self.CONST_BATCH_SIZE):
+            key = canonical_key(song[MongoController.CONST_PROPERTY_TITLE], song[MongoController.CONST_PROPERTY_ARTIST])
+            groups.setdefault(key, []).append(song)
+        return groups
+
+    def run(self, dry_run=False):
+        report = DedupeReport()
+        song_writes = []
+        renames = {}  # (title, artist) of a removed song -> (title, artist) of the song kept in its place.
+
+        for key, songs in self.scan().items():
+            report.songs += len(songs)
+            keeper = songs[0]
+            fields = {}
+            if keeper.get(MongoController.CONST_PROPERTY_KEY) != key:
+                fields[MongoController.CONST_PROPERTY_KEY] = key
+                report.keyed += 1
+
+            if len(songs) > 1:
+                report.groups += 1
+                report.removed += len(songs) - 1
+                if not keeper.get(MongoController.CONST_PROPERTY_YOUTUBE):
+                    links = [song[MongoController.CONST_PROPERTY_YOUTUBE] for song in songs
+                             if song.get(MongoController.CONST_PROPERTY_YOUTUBE)]
+                    if links:
+                        fields[MongoController.CONST_PROPERTY_YOUTUBE] = links[-1]
+                song_writes.append(DeleteMany({MongoController.CONST_PROPERTY_ID:
+                                               {"$in": [song[MongoController.CONST_PROPERTY_ID] for song in songs[1:]]}}))
+                for song in songs[1:]:
+                    renames[self.song_key(song)] = self.song_key(keeper)
+
+            if fields:
+                # deletes go first in the batch, so the unique key is free by the time the keeper takes it.
+                song_writes.append(UpdateOne({MongoController.CONST_PROPERTY_ID: keeper[MongoController.CONST_PROPERTY_ID]},
+                                             {"$set": fields,
+                                              "$currentDate": {MongoController.CONST_PROPERTY_UPDATED_AT: True}}))
+
+        if dry_run:
+            return report
+
+        for start in range(0, len(song_writes), self.CONST_BATCH_SIZE):
+            self.database.songs.bulk_write(song_writes[start:start + self.CONST_BATCH_SIZE], ordered=True)
+        report.playlists = self.merge_playlists(renames)
+        report.plays = self.merge_plays(renames)
+        self.mongo.create_key_index(self.database)  # raises if duplicates were added while the job ran.
+        mongo_client.ensure_schema(self.database, MongoController.CONST_SCHEMA_NAME,
+                                   MongoController.CONST_SCHEMA_VERSION, self.mongo.setup)
+        return report
+
+    @staticmethod
+    def song_key(song):
+        return song[MongoController.CONST_PROPERTY_TITLE], song[MongoController.CONST_PROPERTY_ARTIST]
+
+    def merge_playlists(self, renames):
+        updated = 0
+        for playlist in self.database.playlists.find({}):
+            keys = playlist.get(MongoController.CONST_PROPERTY_SONGS, [])
+            merged = []
+            for key in keys:
+                title, artist = renames.get(self.song_key(key), self.song_key(key))
+                merged.append({MongoController.CONST_PROPERTY_TITLE: title, MongoController.CONST_PROPERTY_ARTIST: artist})
+            if merged != keys:
+                self.database.playlists.update_one({MongoController.CONST_PROPERTY_ID: playlist["_id"]},
+                                                           {"$set": {MongoController.CONST_PROPERTY_SONGS: merged}})
+                updated += 1
+        return updated
+
+    def merge_plays(self, renames):
+        writes = [UpdateMany({MongoController.CONST_PROPERTY_TITLE: old[0], MongoController.CONST_PROPERTY_ARTIST: old[1]},
+                             {"$set": {MongoController.CONST_PROPERTY_TITLE: new[0],
+                                       MongoController.CONST_PROPERTY_ARTIST: new[1]}})
+                  for old, new in renames.items()]
+        moved = 0
+        for start in range(0, len(writes), self.CONST_BATCH_SIZE):
+            moved += self.database.plays.bulk_write(writes[start:start + self.CONST_BATCH_SIZE],
+                                                           ordered=False).matched_count
+        return moved
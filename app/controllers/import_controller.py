@@ -0,0 +1,130 @@
+import csv
+import json
+from time import perf_counter
+from pymongo import errors
+from app.controllers.mongo_controller import MongoController
+from app.models.song_key import canonical_key
+
+
+class ImportReport:
+
+    def __init__(self, start=0):
+        self.start = start
+        self.position = start  # rows before this one are stored, pass it back as start to resume.
+        self.rows = 0
+        self.upserted = 0
+        self.matched = 0
+        self.invalid = []  # (row number, reason)
+        self.duplicates = 0  # rows skipped because their canonical key was already seen.
+        self.batch_errors = []  # (row number of the batch, error details)
+        self.elapsed = 0.0
+        self.finished = False
+
+    def rows_per_second(self):
+        if self.elapsed == 0:
+            return 0.0
+        return self.rows / self.elapsed
+
+
+class ImportController:
+
+    # Constants
+    CONST_DEFAULT_BATCH_SIZE = 1000
+    CONST_FIELDS = (MongoController.CONST_PROPERTY_TITLE,
+                    MongoController.CONST_PROPERTY_ARTIST,
+                    MongoController.CONST_PROPERTY_YOUTUBE)
+
+    def __init__(self, mongo, batch_size=CONST_DEFAULT_BATCH_SIZE, ordered=False, skip_existing=False):
+        self.mongo = mongo
+        self.batch_size = batch_size
+        self.ordered = ordered
+        # skip_existing loads every canonical key in the catalog up front, so songs already stored are skipped
+        # instead of having their links updated.
+        self.skip_existing = skip_existing
+
+    @staticmethod
+    def read_rows(path):
+        # JSON lines come back unparsed, so a malformed line is reported by run() like any other invalid row.
+        with open(path, newline="", encoding="utf-8") as handle:
+            if path.endswith(".jsonl"):
+                for line in handle:
+                    if line.strip():
+                        yield line
+            else:
+                for row in csv.DictReader(handle):
+                    yield row
+
+    def normalize(self, row):
+        if isinstance(row, str):
+            row = json.loads(row)
+        song = {}
+        for field in self.CONST_FIELDS:
+            value = row.get(field)
+            if not isinstance(value, str) or not value.strip():
+                raise ValueError("missing {0}".format(field))
+            song[field] = " ".join(value.split())
+        song[MongoController.CONST_PROPERTY_KEY] = canonical_key(song[MongoController.CONST_PROPERTY_TITLE],
+                                                                 song[MongoController.CONST_PROPERTY_ARTIST])
+        return song
+
+    def run(self, rows, start=0):
+        report = ImportReport(start)
+        batch = []
+        batch_start = start
+        began = perf_counter()
+        seen = self.mongo.get_song_keys() if self.skip_existing else set()
+
+        for number, row in enumerate(rows):
+            if number < start:
+                continue
+            try:
+                song = self.normalize(row)
+                if song[MongoController.CONST_PROPERTY_KEY] in seen:
+                    report.duplicates += 1
+                else:
+                    seen.add(song[MongoController.CONST_PROPERTY_KEY])
+                    batch.append(song)
+            except (ValueError, AttributeError) as e:
+                report.invalid.append((number, str(e)))
+            report.rows += 1
+
+            if len(batch) == self.batch_size:
+                if not self.write(batch, batch_start, report):
+                    break
+                batch = []
+                batch_start = number + 1
+                report.position = batch_start
+                self.progress(report, began)
+        else:
+            if not batch or self.write(batch, batch_start, report):
+                report.position = start + report.rows
+                report.finished = True
+
+        report.elapsed = perf_counter() - began
+        return report
+
+    def write(self, batch, batch_start, report):
+        try:
+            result = self.mongo.insert_songs(batch, self.ordered)
+            report.upserted += result.upserted_count
+            report.matched += result.matched_count
+
+        except errors.BulkWriteError as e:
+            report.upserted += e.details.get("nUpserted", 0)
+            report.matched += e.details.get("nMatched", 0)
+            report.batch_errors.append((batch_start, e.details.get("writeErrors", [])))
+            # unordered batches apply every row they can, ordered ones stop at the first error.
+            return not self.ordered
+
+        except errors.PyMongoError as e:
+            report.batch_errors.append((batch_start, str(e)))
+            return False
+
+        return True
+
+    @staticmethod
+    def progress(report, began):
+        elapsed = perf_counter() - began
+        print("{0} rows imported, {1:.0f} rows/sec, {2} invalid, {3} duplicates, {4} batch errors".format(
+            report.position, report.rows / elapsed if elapsed else 0.0, len(report.invalid), report.duplicates,
+            len(report.batch_errors)))
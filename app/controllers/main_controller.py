@@ -1,95 +1,238 @@
 from sys import exit
+from pymongo import errors
+from app.controllers.catalog_cache import CatalogCache
+from app.models.catalog import Catalog
+from app.models.catalog_segment import SharedCatalog
+from app.models.play_history import FileSink, PlayHistory
 from app.models.player import Player
+from app.models.search_index import SearchIndex
 from app.controllers.mongo_controller import MongoController
+from app.views.song_list_view import Screen, SongListView
+import config
 
 
 class MainController:
 
-    def __init__(self):
-        self.player = Player()  # a var that sets up the player class for later use.
-        self.songs = MongoController("localhost", "27017", "admin", "pa55word").get_all_songs()
-        self.queue_builder = []
+    # Constants
+    CONST_STATE_START = "main"
+    CONST_STATE_OFF = "off"
+    # Every menu is a state with a render_<state> method that prints it and a handle_<state> method
+    # that takes the typed action and returns the next state. A render may return a state to skip input.
+    CONST_STATES = ("main", "play", "again", "queue", "add", "playlist", "move", "remove",
+                    "queue_play", "queue_play_options", "search", "search_pick", "save_playlist", "load_playlist",
+                    "charts")
+    CONST_CHART_LENGTH = 10
+    CONST_BLOCKING_STATES = ("save_playlist", "load_playlist")  # menus that wait on Mongo.
+
+    view = SongListView()  # shared, so every controller in a process reuses the same formatted lines.
+
+    def __init__(self, catalog=None, index=None, mongo=None, history=None):
+        if catalog is None:
+            mongo = mongo or MongoController()
+            catalog = Catalog(self.catalog_source(mongo))
+        if history is None:
+            sink = FileSink(config.PLAY_HISTORY_PATH) if config.PLAY_HISTORY_PATH else mongo
+            history = PlayHistory(sink).load_in_background()
+        self.history = history  # shared with other controllers in the process when one is passed in.
+        self.player = Player(history=history)  # a var that sets up the player class for later use.
+        self.catalog = catalog  # pages load on demand.
+        self.mongo = mongo  # saved playlists live in Mongo, they are unavailable without it.
+        self.index = index  # built from the whole catalog the first time someone searches, unless shared.
+        self.search_results = []
+        self.queue_page = 0
+        self.states = {state: (getattr(self, "render_" + state), getattr(self, "handle_" + state))
+                       for state in self.CONST_STATES}
+
+    @staticmethod
+    def catalog_source(mongo):
+        # a published shared segment costs nothing to attach, otherwise this kiosk keeps its own snapshot.
+        if config.CATALOG_SEGMENT_PATH:
+            try:
+                return SharedCatalog(config.CATALOG_SEGMENT_PATH)
+            except (OSError, ValueError) as e:
+                print("Could not attach the shared catalog, loading a local copy.")
+                print(e)
+        return CatalogCache.load(mongo)
+
+    def run(self, read=input, state=CONST_STATE_START):
+        # read is called once per prompt, so a script can drive the menus instead of a keyboard.
+        while state != self.CONST_STATE_OFF:
+            state = self.step(state, read)
+        self.history.flush()
+        return self.off()
+
+    def step(self, state, read):
+        state = self.enter(state)
+        if state == self.CONST_STATE_OFF:
+            return state
+        action = read("> ")
+        with Screen():
+            return self.handle(state, action)
+
+    def enter(self, state):
+        # prints the menu for state and returns the state that is waiting for input.
+        with Screen():
+            while state != self.CONST_STATE_OFF:
+                redirect = self.states[state][0]()
+                if redirect is None:
+                    break
+                state = redirect
+        return state
+
+    def handle(self, state, action):
+        return self.states[state][1](action)
 
     def action(self, act):
-        num = int(act)
-        length = len(self.songs)
-        if num <= length:
-            num -= 1
-            self.player.add(self.songs[num])
+        song = self.catalog.song(int(act))
+        if song is not None:
+            self.player.add(song)
+            print("")
+
+    def catalog_options(self):
+        page = self.catalog.current()
+        self.options(page.songs, page.offset + 1)
+        if self.catalog.history or page.has_next():
             print("")
+            print("type 'next' or 'prev' to see more songs.")
+
+    def page_action(self, action):
+        if action == 'next':
+            self.catalog.next()
+            return True
+
+        elif action == 'prev':
+            self.catalog.prev()
+            return True
+
+        return False
+
+    def queue_position(self, action):
+        return action.isdigit() and 0 < int(action) <= len(self.player.queue)
+
+    def queue_options(self):
+        entries, start = self.view.page(self.player.queue, self.queue_page)
+        self.options([entry.song for entry in entries], start + 1)
+        if self.view.page_count(self.player.queue) > 1:
+            print("")
+            print("type 'next' or 'prev' to see more of the playlist.")
+
+    def queue_page_action(self, action):
+        if action == 'next':
+            self.queue_page = min(self.queue_page + 1, self.view.page_count(self.player.queue) - 1)
+            return True
+
+        elif action == 'prev':
+            self.queue_page = max(self.queue_page - 1, 0)
+            return True
+
+        return False
 
-    def add(self):
+    def render_add(self):
         print("")
         print("Which song do you want to add?")
-        self.options(self.songs)
+        self.catalog_options()
         print("")
         print("type 'main' to return to main menu, also discards your playlist.")
         print("note: each song can only be added once.")
         print("")
 
-        action = input("> ")
-        action.lower()
-
+    def handle_add(self, action):
         if action.isdigit():
             self.action(action)
-            return self.playlist()
+            return "playlist"
+
+        elif self.page_action(action):
+            return "add"
 
         elif action == 'main':
             self.player.queue.clear()
-            del self.queue_builder[:]
-            return self.main()
+            return "main"
 
         else:
             self.not_valid()
-            return self.add()
+            return "add"
 
-    def again(self):
+    @staticmethod
+    def render_again():
         print("")
         print("Play another song? (Y/N)")
         print("Note: selecting no(N) will power off the system.")
         print("Typing in 'main' will bring you back to the main menu")
         print("")
 
-        action = input("> ")
-        action.lower()
-
+    def handle_again(self, action):
         if action == 'y':
-            return self.play()
+            return "play"
 
         elif action == 'n':
             print("Powering off, have a nice day.")
-            return self.off()
+            return self.CONST_STATE_OFF
 
         elif action == 'main':
-            return self.main()
+            return "main"
 
         else:
             self.not_valid()
-            return self.again()
+            return "again"
 
-    def main(self):
+    @staticmethod
+    def render_main():
         print("")
         print("Welcome to the main menu please select a option:")
         print("1. Play a song.")
         print("2. Create and play a playlist.")
         print("3. Power off.")
+        print("4. Search for a song.")
+        print("5. Load a saved playlist.")
+        print("6. See the most sung songs.")
         print("")
 
-        action = input("> ")
-
+    def handle_main(self, action):
         if action == '1':
-            return self.play()
+            return "play"
 
         elif action == '2':
-            return self.queue()
+            return "queue"
 
         elif action == '3':
             print("Powering off, have a nice day.")
-            return self.off()
+            return self.CONST_STATE_OFF
+
+        elif action == '4':
+            return "search"
+
+        elif action == '5':
+            return "load_playlist"
+
+        elif action == '6':
+            return "charts"
 
         else:
             self.not_valid()
-            return self.main()
+            return "main"
+
+    def render_move(self):
+        print("")
+        print("Which song do you want to move to the top of the playlist?")
+        self.queue_options()
+        print("")
+        print("Type 'playlist' to go back to the playlist.")
+        print("")
+
+    def handle_move(self, action):
+        if self.queue_position(action):
+            self.player.move_to_front(self.player.queue[int(action) - 1])
+            return "playlist"
+
+        elif action == 'playlist':
+            return "playlist"
+
+        elif self.queue_page_action(action):
+            return "move"
+
+        else:
+            self.not_valid()
+            return "move"
 
     @staticmethod
     def not_valid():
@@ -101,144 +244,290 @@ class MainController:
         return exit(1)
 
     @staticmethod
-    def options(song_list):
-        count = 1
-        for song in song_list:
-            print(
-                "{0}. Title: {1}, Artist: {2}, Link:{3}".format(count, song.get_title(), song.get_artist(),
-                                                                song.get_link()))
-            count += 1
+    def options(song_list, count=1):
+        lines = MainController.view.format(song_list, count)
+        if lines:
+            print(lines)
 
-    def play(self):
+    def render_play(self):
         print("")
         print("Which song do you want to play:")
-        self.options(self.songs)
+        self.catalog_options()
         print("")
         print("type main to go back to main menu")
         print("")
 
-        action = input("> ")
-
+    def handle_play(self, action):
         if action.isdigit():
             self.action(action)
-            return self.again()
+            return "again"
+
+        elif self.page_action(action):
+            return "play"
 
         elif action == "main":
-            return self.main()
+            return "main"
 
         else:
             self.not_valid()
-            return self.play()
+            return "play"
 
-    def playlist(self):
+    def render_playlist(self):
         print("")
         print("Current song(s) in playlist:")
-        self.options(self.player.queue)
+        self.queue_options()
         print("")
         print("Would you like to 'play' the list now? type in 'play'.")
         print("if you want to add more songs type in 'add'.")
         print("if you want to remove a song type in 'remove'.")
+        print("if you want to move a song to the top of the list type in 'move'.")
+        print("if you want to keep this playlist for another night type in 'save'.")
         print("if you want to return to the main menu type in 'main'.")
         print("note if you return to main, your playlist will be deleted.")
         print("")
 
-        action = input("> ")
-        action.lower()
-
+    def handle_playlist(self, action):
         if action == 'main':
             self.player.queue.clear()
-            return self.main()
+            return "main"
 
         elif action == 'play':
-            return self.queue_play()
+            return "queue_play"
 
         elif action == 'add':
-            return self.add()
+            return "add"
 
         elif action == 'remove':
-            return self.remove()
+            return "remove"
+
+        elif action == 'move':
+            return "move"
+
+        elif action == 'save':
+            return "save_playlist"
+
+        elif self.queue_page_action(action):
+            return "playlist"
 
         else:
             self.not_valid()
-            return self.playlist()
+            return "playlist"
 
-    def queue(self):
+    def render_save_playlist(self):
         print("")
-        print("The playlist is currently empty.")
-        print("Which song do you want to add to the playlist?")
-        self.options(self.songs)
+        if self.mongo is None:
+            print("Saved playlists are not available right now.")
+            return "playlist"
+        print("Type a name for this playlist, an existing playlist with that name is replaced:")
+        print("Type 'playlist' to go back to the playlist.")
+        print("")
+
+    def handle_save_playlist(self, action):
+        name = action.strip()
+        if name == 'playlist':
+            return "playlist"
+
+        elif name:
+            try:
+                self.mongo.save_playlist(name, self.player.queue)
+            except errors.PyMongoError as e:
+                self.playlists_unavailable(e)
+                return "playlist"
+            print("Playlist '{0}' saved with {1} song(s).".format(name, len(self.player.queue)))
+            return "playlist"
+
+        else:
+            self.not_valid()
+            return "save_playlist"
+
+    def render_charts(self):
+        for title, window in (("Most sung tonight:", "tonight"), ("Most sung this month:", "month")):
+            print("")
+            print(title)
+            chart = self.history.chart(window, self.CONST_CHART_LENGTH)
+            if not chart:
+                print("Nothing has been sung yet.")
+            for number, ((song_title, artist), plays) in enumerate(chart, 1):
+                print("{0}. {1} by {2}, sung {3} time(s)".format(number, song_title, artist, plays))
         print("")
         print("type main to go back to main menu")
         print("")
 
-        action = input("> ")
-        action.lower()
+    def handle_charts(self, action):
+        if action == 'main':
+            return "main"
 
-        if action.isdigit():
-            self.action(action)
-            return self.playlist()
+        else:
+            self.not_valid()
+            return "charts"
+
+    def render_load_playlist(self):
+        print("")
+        if self.mongo is None:
+            print("Saved playlists are not available right now.")
+            return "main"
+        try:
+            names = self.mongo.get_playlist_names()
+        except errors.PyMongoError as e:
+            self.playlists_unavailable(e)
+            return "main"
+        if not names:
+            print("There are no saved playlists yet, returning to main.")
+            return "main"
+        print("Saved playlists:")
+        for name in names:
+            print(name)
+        print("")
+        print("Type the name of the playlist to load, this replaces your current playlist.")
+        print("type main to go back to main menu")
+        print("")
+
+    def handle_load_playlist(self, action):
+        name = action.strip()
+        if name == 'main':
+            return "main"
+
+        try:
+            keys = self.mongo.load_playlist(name)
+            if keys is None:
+                print("There is no playlist called '{0}'.".format(name))
+                return "load_playlist"
+            songs = self.resolve(keys)
+        except errors.PyMongoError as e:
+            self.playlists_unavailable(e)
+            return "main"
+
+        self.player.queue.clear()
+        for song in songs:
+            self.player.queue.append(song)
+        print("Loaded {0} song(s) from '{1}'.".format(len(self.player.queue), name))
+        if len(songs) < len(keys):
+            print("{0} song(s) are no longer in the catalog.".format(len(keys) - len(songs)))
+        return "playlist"
+
+    @staticmethod
+    def playlists_unavailable(error):
+        print("Saved playlists are not available right now, please try again later.")
+        print(error)
+
+    def resolve(self, keys):
+        # the local catalog answers in one query when it can, otherwise Mongo does.
+        source = self.catalog.source
+        if hasattr(source, "get_songs"):
+            return source.get_songs(keys)
+        return self.mongo.get_songs(keys)
+
+    @staticmethod
+    def render_search():
+        print("")
+        print("Type part of a song title or artist to search for:")
+        print("type 'main' to go back to main menu")
+        print("")
+
+    def handle_search(self, action):
+        if action == 'main':
+            return "main"
+
+        self.search_results = self.search_index().search(action, popularity=self.history.popularity)
+        if not self.search_results:
+            print("No songs found.")
+            return "search"
+
+        return "search_pick"
+
+    def search_index(self):
+        # a shared catalog searches the index its publisher stored, always the one of the newest segment.
+        source = self.catalog.source
+        if hasattr(source, "search_index"):
+            return source.search_index()
+        if self.index is None:
+            self.index = SearchIndex(source.iter_songs())
+        return self.index
+
+    def render_search_pick(self):
+        print("")
+        print("Which song do you want to play:")
+        self.options(self.search_results)
+        print("")
+        print("type 'search' to search again.")
+        print("type main to go back to main menu")
+        print("")
+
+    def handle_search_pick(self, action):
+        if action.isdigit() and 0 < int(action) <= len(self.search_results):
+            self.player.play(self.search_results[int(action) - 1])
+            return "again"
+
+        elif action == 'search':
+            return "search"
 
         elif action == 'main':
-            return self.main()
+            return "main"
 
         else:
             self.not_valid()
-            return self.queue()
+            return "search_pick"
 
-    def queue_play(self):
-        self.player.queue_play()
+    def render_queue(self):
         print("")
-        print("If you want to play the song list again type in 'play'")
-        print("If you want to return to the main menu type in 'main'")
-        print("Note: returning to the main menu will erase your playlist.")
+        print("The playlist is currently empty.")
+        print("Which song do you want to add to the playlist?")
+        self.catalog_options()
+        print("")
+        print("type main to go back to main menu")
         print("")
 
-        action = input("> ")
-        action.lower()
+    def handle_queue(self, action):
+        if action.isdigit():
+            self.action(action)
+            return "playlist"
 
-        if action == 'play':
-            return self.queue_play()
+        elif self.page_action(action):
+            return "queue"
 
         elif action == 'main':
-            del self.queue_builder[:]
-            self.player.queue.clear()
-            return self.main()
+            return "main"
 
         else:
             self.not_valid()
-            del self.queue_builder[:]
-            return self.queue_play_options()
+            return "queue"
+
+    def render_queue_play(self):
+        self.player.queue_play()
+        return self.render_queue_play_options()
 
-    def queue_play_options(self):
+    @staticmethod
+    def render_queue_play_options():
         print("")
         print("If you want to play the song list again type in 'play'")
         print("If you want to return to the main menu type in 'main'")
         print("Note: returning to the main menu will erase your playlist.")
-        action = input("> ")
-        action.lower()
+        print("")
+
+    def handle_queue_play(self, action):
+        return self.handle_queue_play_options(action)
 
+    def handle_queue_play_options(self, action):
         if action == 'play':
-            return self.queue_play()
+            return "queue_play"
 
         elif action == 'main':
-            del self.queue_builder[:]
             self.player.queue.clear()
-            return self.main()
+            return "main"
 
         else:
             self.not_valid()
-            del self.queue_builder[:]
-            return self.queue_play_options()
+            return "queue_play_options"
 
-    def remove(self):
+    def render_remove(self):
         print("")
         print("Which song do you want to remove?")
         if len(self.player.queue) == 0:
             print("The playlist is empty returning to main.")
             print("")
-            return self.main()
+            return "main"
         else:
-            self.removal_list(self.player.queue)
+            self.queue_options()
         print("")
         print("Type 'play' to play the current playlist.")
         print("Type 'add' to add songs to the playlist.")
@@ -246,44 +535,24 @@ class MainController:
         print("note: returning to the main menu will discard your playlist.")
         print("")
 
-        action = input("> ")
-        action.lower()
-
-        if action.isdigit():
-            num = int(action)
-            length = len(self.player.queue)
-            if num <= length:
-                num -= 1
-                self.player.remove(self.queue_builder[num])
-                del self.queue_builder[:]
-                return self.remove()
+    def handle_remove(self, action):
+        if self.queue_position(action):
+            self.player.remove(self.player.queue[int(action) - 1])
+            return "remove"
 
         elif action == 'main':
             self.player.queue.clear()
-            del self.queue_builder[:]
-            return self.main()
+            return "main"
 
         elif action == 'play':
-            del self.queue_builder[:]
-            return self.queue_play()
+            return "queue_play"
 
         elif action == 'add':
-            del self.queue_builder[:]
-            return self.add()
+            return "add"
+
+        elif self.queue_page_action(action):
+            return "remove"
 
         else:
             self.not_valid()
-            del self.queue_builder[:]
-            return self.remove()
-
-    def removal_list(self, queue):
-        count = 1
-
-        for song in queue:
-            self.queue_builder.append(song)
-
-        for item in self.queue_builder:
-            print(
-                "{0}. Title: {1}, Artist: {2}, Link:{3}".format(count, item.get_title(), item.get_artist(),
-                                                                item.get_link()))
-            count += 1
+            return "remove"
@@ -0,0 +1,65 @@
+from threading import Lock
+from urllib.parse import quote_plus
+from pymongo import MongoClient, errors
+import config
+
+# Constants
+CONST_SCHEMA_COLLECTION = "schema"
+CONST_PROPERTY_VERSION = "version"
+
+_client = None
+_lock = Lock()
+_database = None
+_ready = set()  # (database id, schema name) pairs already checked by this process.
+
+
+def connection_string():
+    if config.MONGO_URI:
+        return config.MONGO_URI
+    if not config.MONGO_USERNAME or not config.MONGO_PASSWORD:
+        # raised on first use, as a PyMongoError, so kiosks report it like any other connection problem.
+        raise errors.ConfigurationError("Mongo credentials are not set, set MONGO_URI or MONGO_USERNAME and "
+                                        "MONGO_PASSWORD.")
+    return "mongodb://{0}:{1}@{2}:{3}".format(quote_plus(config.MONGO_USERNAME), quote_plus(config.MONGO_PASSWORD),
+                                              config.MONGO_HOST, config.MONGO_PORT)
+
+
+def get_client():
+    # one client per process; connect=False defers the connection and monitor threads to the first query.
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = MongoClient(connection_string(), connect=False,
+                                      maxPoolSize=config.MONGO_MAX_POOL_SIZE,
+                                      minPoolSize=config.MONGO_MIN_POOL_SIZE,
+                                      connectTimeoutMS=config.MONGO_CONNECT_TIMEOUT_MS,
+                                      serverSelectionTimeoutMS=config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                                      socketTimeoutMS=config.MONGO_SOCKET_TIMEOUT_MS)
+    return _client
+
+
+def get_database():
+    global _database
+    if _database is None:
+        _database = get_client()[config.MONGO_DB_NAME]
+    return _database
+
+
+def ensure_schema(database, name, version, setup):
+    # runs setup(database) when the stored version of schema `name` is older than `version`,
+    # and checks at most once per process. A setup that returns False could not finish, so the version is
+    # not stored and the next process tries again.
+    key = (id(database), name)
+    if key in _ready:
+        return
+    with _lock:
+        if key in _ready:
+            return
+        schema = database[CONST_SCHEMA_COLLECTION]
+        stored = schema.find_one({"_id": name})
+        if stored is None or stored.get(CONST_PROPERTY_VERSION, 0) < version:
+            if setup(database) is not False:
+                schema.replace_one({"_id": name}, {"_id": name, CONST_PROPERTY_VERSION: version},
+                                   upsert=True)
+        _ready.add(key)
@@ -1,58 +1,188 @@
-from pymongo import MongoClient, errors
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, UpdateOne, errors
+from app.controllers import mongo_client
+from app.models.catalog import CatalogPage
 from app.models.song import Song
+from app.models.song_key import canonical_key
+from app.models.song_table import SongTable
 
 
-class MongoController(MongoClient):
+class MongoController:
 
     # Constants
-    CONST_DB_NAME = "karaoke"
+    CONST_SCHEMA_NAME = "songs"
+    CONST_SCHEMA_VERSION = 4
     CONST_PROPERTY_ID = "_id"
     CONST_PROPERTY_TITLE = "title"
     CONST_PROPERTY_ARTIST = "artist"
     CONST_PROPERTY_YOUTUBE = "youtube"
-
-    def __init__(self, db_host, db_port, db_username, db_password):
-        super().__init__()
-        self.dbHost = db_host
-        self.dbPort = db_port
-        self.dbUsername = db_username
-        self.dbPassword = db_password
-
+    CONST_PROPERTY_UPDATED_AT = "updated_at"
+    CONST_PROPERTY_KEY = "key"
+    CONST_PROPERTY_SONGS = "songs"
+    CONST_PROPERTY_PLAYED_AT = "played_at"
+    CONST_BATCH_SIZE = 1000
+    CONST_SONG_PROJECTION = {CONST_PROPERTY_TITLE: 1, CONST_PROPERTY_ARTIST: 1, CONST_PROPERTY_YOUTUBE: 1}
+
+    def __init__(self, database=None):
+        self.database = database
+
+    @property
+    def client(self):
+        database = self.raw_client
+        mongo_client.ensure_schema(database, self.CONST_SCHEMA_NAME, self.CONST_SCHEMA_VERSION, self.setup)
+        return database
+
+    @property
+    def raw_client(self):
+        # the database is resolved on first use, so constructing a controller never touches the network.
+        # Skips the schema check, for maintenance jobs that must run before the schema can be set up.
+        if self.database is None:
+            self.database = mongo_client.get_database()
+        return self.database
+
+    @property
+    def songsCollections(self):
+        return self.client.songs
+
+    @property
+    def playlistsCollections(self):
+        return self.client.playlists
+
+    @property
+    def playsCollections(self):
+        return self.client.plays
+
+    def setup(self, database):
+
+        database.songs.create_index([(self.CONST_PROPERTY_TITLE, ASCENDING), (self.CONST_PROPERTY_ARTIST, ASCENDING)])
+        database.songs.create_index([(self.CONST_PROPERTY_UPDATED_AT, ASCENDING)])
+        database.plays.create_index([(self.CONST_PROPERTY_PLAYED_AT, ASCENDING)])
+        # without the key index the schema version is not bumped, so every new process retries it and warns again.
         try:
-            connection_string = "mongodb://{0}:{1}@{2}:{3}".format(db_username, db_password, db_host, db_port)
-            self.client = MongoClient(connection_string)[self.CONST_DB_NAME]
-            self.songsCollections = self.client.songs
-            self.songsCollections.create_index([(self.CONST_PROPERTY_TITLE, 1),
-                                                (self.CONST_PROPERTY_ARTIST, 1)], default_language='english')
-
-        except errors.ServerSelectionTimeoutError as e:
-            print("Error connecting to mongo")
+            self.create_key_index(database)
+        except errors.OperationFailure as e:
+            print("The catalog has duplicate songs, run dedupe_songs.py to merge them.")
             print(e)
+            return False
+        return True
+
+    def create_key_index(self, database):
+
+        # songs stored before canonical keys existed have none, so only documents with a key are indexed.
+        database.songs.create_index([(self.CONST_PROPERTY_KEY, ASCENDING)], unique=True,
+                                    partialFilterExpression={self.CONST_PROPERTY_KEY: {"$type": "string"}})
 
     def get_all_songs(self):
 
-        songs = self.songsCollections.find()[:50]
-        song_list = []
+        return SongTable.from_songs(self.iter_songs())
+
+    def iter_songs(self, batch_size=CONST_BATCH_SIZE):
+
+        songs = self.songsCollections.find({}, self.CONST_SONG_PROJECTION).sort(self.CONST_PROPERTY_ID, ASCENDING)
+
+        for item in songs.batch_size(batch_size):
+            yield self.to_song(item)
+
+    def get_changed_songs(self, since=None, batch_size=CONST_BATCH_SIZE):
+
+        # raw documents with _id and updated_at, for syncing a local copy of the catalog.
+        query = {}
+        if since is not None:
+            query[self.CONST_PROPERTY_UPDATED_AT] = {"$gte": since}
+
+        projection = dict(self.CONST_SONG_PROJECTION)
+        projection[self.CONST_PROPERTY_UPDATED_AT] = 1
+
+        return self.songsCollections.find(query, projection).batch_size(batch_size)
+
+    def get_page(self, token=None, page_size=CONST_BATCH_SIZE, offset=0):
+
+        # Pages are keyed on _id so a token stays valid however far into the catalog it points.
+        query = {}
+        if token is not None:
+            query[self.CONST_PROPERTY_ID] = {"$gt": ObjectId(token)}
 
-        for item in songs:
-            convert = Song(item[self.CONST_PROPERTY_TITLE], item[self.CONST_PROPERTY_ARTIST],
-                           item[self.CONST_PROPERTY_YOUTUBE])
-            song_list.append(convert)
+        songs = self.songsCollections.find(query, self.CONST_SONG_PROJECTION)\
+            .sort(self.CONST_PROPERTY_ID, ASCENDING).limit(page_size + 1)
 
-        return song_list
+        items = list(songs)
+        next_token = None
+        if len(items) > page_size:
+            items = items[:page_size]
+            next_token = str(items[-1][self.CONST_PROPERTY_ID])
+
+        return CatalogPage([self.to_song(item) for item in items], offset, token, next_token)
+
+    def to_song(self, item):
+
+        return Song(item[self.CONST_PROPERTY_TITLE], item[self.CONST_PROPERTY_ARTIST], item[self.CONST_PROPERTY_YOUTUBE])
 
     def get_song(self, title, artist):
 
         return self.songsCollections.find_one({self.CONST_PROPERTY_TITLE: title, self.CONST_PROPERTY_ARTIST: artist})
 
+    def get_songs(self, keys):
+
+        # resolves (title, artist) keys with one $or query; the songs come back in the order of keys.
+        keys = list(keys)
+        if not keys:
+            return []
+
+        query = {"$or": [{self.CONST_PROPERTY_TITLE: title, self.CONST_PROPERTY_ARTIST: artist}
+                         for title, artist in set(keys)]}
+        found = {}
+        for item in self.songsCollections.find(query, self.CONST_SONG_PROJECTION).batch_size(len(keys)):
+            found[(item[self.CONST_PROPERTY_TITLE], item[self.CONST_PROPERTY_ARTIST])] = self.to_song(item)
+
+        return [found[key] for key in keys if key in found]
+
+    def get_song_keys(self):
+
+        # every canonical key in the catalog, so an import can spot duplicates without a query per row.
+        songs = self.songsCollections.find({self.CONST_PROPERTY_KEY: {"$type": "string"}},
+                                           {self.CONST_PROPERTY_ID: 0, self.CONST_PROPERTY_KEY: 1})
+
+        return {item[self.CONST_PROPERTY_KEY] for item in songs.batch_size(self.CONST_BATCH_SIZE)}
+
     def insert_song(self, title, artist, youtube):
 
         song = {self.CONST_PROPERTY_TITLE: title,
                 self.CONST_PROPERTY_ARTIST: artist,
                 self.CONST_PROPERTY_YOUTUBE: youtube}
 
-        return self.songsCollections.update({self.CONST_PROPERTY_TITLE: title, self.CONST_PROPERTY_ARTIST: artist},
-                                            song, True)
+        return self.songsCollections.update_one(self.upsert_filter(song), self.upsert_document(song), upsert=True)
+
+    def insert_songs(self, songs, ordered=False):
+
+        # songs is a list of dicts with title, artist and youtube, sent as one bulk_write round trip.
+        requests = [UpdateOne(self.upsert_filter(song), self.upsert_document(song), upsert=True) for song in songs]
+
+        return self.songsCollections.bulk_write(requests, ordered=ordered)
+
+    def upsert_filter(self, song):
+
+        # matches the song by canonical key, or by exact title and artist if it was stored before keys existed.
+        return {"$or": [{self.CONST_PROPERTY_KEY: self.song_key(song)},
+                        {self.CONST_PROPERTY_TITLE: song[self.CONST_PROPERTY_TITLE],
+                         self.CONST_PROPERTY_ARTIST: song[self.CONST_PROPERTY_ARTIST]}]}
+
+    def song_key(self, song):
+
+        # the import already computes keys, other callers get one here without touching their dict.
+        key = song.get(self.CONST_PROPERTY_KEY)
+        if key is None:
+            key = canonical_key(song[self.CONST_PROPERTY_TITLE], song[self.CONST_PROPERTY_ARTIST])
+        return key
+
+    def upsert_document(self, song):
+
+        # the first spelling of a title and artist is kept, later imports of the same song only update its link.
+        # updated_at is stamped by the server so catalog snapshots can sync only what changed.
+        return {"$set": {self.CONST_PROPERTY_YOUTUBE: song[self.CONST_PROPERTY_YOUTUBE],
+                         self.CONST_PROPERTY_KEY: self.song_key(song)},
+                "$setOnInsert": {self.CONST_PROPERTY_TITLE: song[self.CONST_PROPERTY_TITLE],
+                                 self.CONST_PROPERTY_ARTIST: song[self.CONST_PROPERTY_ARTIST]},
+                "$currentDate": {self.CONST_PROPERTY_UPDATED_AT: True}}
 
     def insert_song_obj(self, song):
 
@@ -66,3 +196,51 @@ class MongoController(MongoClient):
 
         return self.songsCollections.remove({self.CONST_PROPERTY_TITLE: title, self.CONST_PROPERTY_ARTIST: artist},
                                             True)
+
+    def save_playlist(self, name, songs):
+
+        # a playlist is stored as one document holding its ordered (title, artist) keys.
+        keys = [{self.CONST_PROPERTY_TITLE: song.get_title(), self.CONST_PROPERTY_ARTIST: song.get_artist()}
+                for song in songs]
+
+        return self.playlistsCollections.update_one({self.CONST_PROPERTY_ID: name},
+                                                    {"$set": {self.CONST_PROPERTY_SONGS: keys},
+                                                     "$currentDate": {self.CONST_PROPERTY_UPDATED_AT: True}},
+                                                    upsert=True)
+
+    def load_playlist(self, name):
+
+        playlist = self.playlistsCollections.find_one({self.CONST_PROPERTY_ID: name})
+        if playlist is None:
+            return None
+
+        return [(key[self.CONST_PROPERTY_TITLE], key[self.CONST_PROPERTY_ARTIST])
+                for key in playlist[self.CONST_PROPERTY_SONGS]]
+
+    def get_playlist_names(self):
+
+        playlists = self.playlistsCollections.find({}, {self.CONST_PROPERTY_ID: 1}).sort(self.CONST_PROPERTY_ID,
+                                                                                           ASCENDING)
+
+        return [playlist[self.CONST_PROPERTY_ID] for playlist in playlists]
+
+    def remove_playlist(self, name):
+
+        return self.playlistsCollections.delete_one({self.CONST_PROPERTY_ID: name})
+
+    def insert_plays(self, plays):
+
+        # plays are (title, artist, played_at) tuples, written as one unordered insert.
+        documents = [{self.CONST_PROPERTY_TITLE: title,
+                      self.CONST_PROPERTY_ARTIST: artist,
+                      self.CONST_PROPERTY_PLAYED_AT: played_at} for title, artist, played_at in plays]
+
+        return self.playsCollections.insert_many(documents, ordered=False)
+
+    def get_plays(self, since):
+
+        plays = self.playsCollections.find({self.CONST_PROPERTY_PLAYED_AT: {"$gte": since}},
+                                           {self.CONST_PROPERTY_ID: 0}).batch_size(self.CONST_BATCH_SIZE)
+
+        for play in plays:
+            yield play[self.CONST_PROPERTY_TITLE], play[self.CONST_PROPERTY_ARTIST], play[self.CONST_PROPERTY_PLAYED_AT]
@@ -0,0 +1,116 @@
+import asyncio
+from io import StringIO
+from app.controllers.catalog_cache import CatalogCache
+from app.controllers.main_controller import MainController
+from app.controllers.mongo_controller import MongoController
+from app.models.catalog import Catalog
+from app.models.play_history import FileSink, PlayHistory
+from app.models.search_index import SearchIndex
+from app.views.song_list_view import ThreadOutput
+import config
+
+
+class ServerController:
+
+    # Constants
+    CONST_PROMPT = "> "
+    CONST_ENCODING = "utf-8"
+    CONST_LINE_LIMIT = 4096  # longest command line a client may send, in bytes.
+
+    def __init__(self, cache=None, host=None, port=None, max_sessions=None, idle_timeout=None):
+        # every session gets its own MainController and Player, but they all read one catalog snapshot,
+        # share one search index and, through the catalog cache, one Mongo client.
+        self.cache = cache
+        self.host = host or config.SERVER_HOST
+        self.port = port or config.SERVER_PORT
+        self.max_sessions = max_sessions or config.SERVER_MAX_SESSIONS
+        self.idle_timeout = idle_timeout or config.SERVER_IDLE_TIMEOUT
+        self.index = None
+        self.history = None
+        self.sessions = 0
+        self.server = None
+
+    async def start(self):
+        if self.cache is None:
+            self.cache = CatalogCache.load(MongoController())
+        if self.history is None:
+            sink = FileSink(config.PLAY_HISTORY_PATH) if config.PLAY_HISTORY_PATH else self.cache.mongo
+            self.history = PlayHistory(sink).load_in_background()
+        self.index = await asyncio.get_running_loop().run_in_executor(None, self.build_index)
+        self.server = await asyncio.start_server(self.session, self.host, self.port, limit=self.CONST_LINE_LIMIT,
+                                                 backlog=self.max_sessions)
+        return self.server
+
+    def build_index(self):
+        # the snapshot gets its own connection here, SQLite connections stay on the thread that made them.
+        cache = CatalogCache(None, self.cache.path)
+        try:
+            return SearchIndex(cache.iter_songs())
+        finally:
+            cache.connection.close()
+
+    async def serve_forever(self):
+        server = await self.start()
+        print("Serving karaoke sessions on {0}:{1}".format(self.host, self.port))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.history.flush()
+
+    @staticmethod
+    def capture(call, *args):
+        # menus print, so each step runs with this thread's stdout captured; other sessions print elsewhere.
+        output = StringIO()
+        targets = ThreadOutput.install().targets()
+        targets.append(output)
+        try:
+            result = call(*args)
+        finally:
+            targets.pop()
+        return result, output.getvalue()
+
+    async def call(self, controller, state, method, *args):
+        # menus that wait on Mongo run on a worker thread, so a slow or unreachable server never stalls the loop.
+        if state in controller.CONST_BLOCKING_STATES:
+            return await asyncio.get_running_loop().run_in_executor(None, self.capture, method, *args)
+        return self.capture(method, *args)
+
+    async def send(self, writer, text):
+        writer.write(text.encode(self.CONST_ENCODING))
+        await writer.drain()  # waits while a slow client's buffer is full instead of queueing more output.
+
+    async def session(self, reader, writer):
+        if self.sessions >= self.max_sessions:
+            await self.send(writer, "The server is busy, please try again later.\n")
+            writer.close()
+            return
+
+        self.sessions += 1
+        controller = MainController(Catalog(self.cache), self.index, self.cache.mongo, self.history)
+        try:
+            state, output = await self.call(controller, controller.CONST_STATE_START, controller.enter,
+                                            controller.CONST_STATE_START)
+            await self.send(writer, output + self.CONST_PROMPT)
+
+            while state != controller.CONST_STATE_OFF:
+                line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                if not line:
+                    break
+                action = line.decode(self.CONST_ENCODING, "replace").strip()
+                state, output = await self.advance(controller, state, action)
+                if state != controller.CONST_STATE_OFF:
+                    output += self.CONST_PROMPT
+                await self.send(writer, output)
+
+        except (asyncio.TimeoutError, asyncio.LimitOverrunError, ValueError, ConnectionError):
+            pass
+
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    async def advance(self, controller, state, action):
+        state, handled = await self.call(controller, state, controller.handle, state, action)
+        state, entered = await self.call(controller, state, controller.enter, state)
+        return state, handled + entered
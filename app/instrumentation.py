@@ -0,0 +1,222 @@
+import atexit
+import logging
+import os
+from bisect import bisect_left
+from functools import wraps
+from threading import Lock, get_ident
+from time import perf_counter
+from types import GeneratorType
+import config
+
+# Nothing is wrapped until enable() is called, so a disabled kiosk runs the plain methods with no overhead.
+
+# Constants
+CONST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                 10.0)  # upper bounds in seconds, the last bucket is everything slower.
+CONST_MONGO_METHODS = ("setup", "get_all_songs", "iter_songs", "get_changed_songs", "get_page", "get_song",
+                       "get_songs", "get_song_keys", "insert_song", "insert_songs", "insert_song_obj", "remove_song",
+                       "save_playlist", "load_playlist", "get_playlist_names", "remove_playlist",
+                       "insert_plays", "get_plays")
+
+_sinks = []
+_originals = []  # (class, attribute, original function) for every wrapped method.
+
+
+class Metric:
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.documents = 0
+        self.buckets = [0] * (len(CONST_BUCKETS) + 1)
+
+    def add(self, seconds, documents):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.documents += documents or 0
+        self.buckets[bisect_left(CONST_BUCKETS, seconds)] += 1
+
+    def percentile(self, fraction):
+        # upper bound of the bucket the percentile falls in, so it errs on the slow side.
+        wanted = fraction * self.count
+        seen = 0
+        for bound, hits in zip(CONST_BUCKETS + (self.max,), self.buckets):
+            seen += hits
+            if seen >= wanted and hits:
+                return min(bound, self.max)
+        return self.max
+
+
+class Stats:
+
+    # in-process sink, read it with report() or through metrics. Calls are recorded from background threads too
+    # (catalog refresh, play history writes), so metrics only change under the lock.
+    def __init__(self):
+        self.metrics = {}
+        self.lock = Lock()
+
+    def record(self, name, seconds, documents):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = Metric()
+            metric.add(seconds, documents)
+
+    def flush(self):
+        pass
+
+    def report(self):
+        lines = []
+        with self.lock:
+            metrics = sorted(self.metrics.items(), key=lambda item: -item[1].total)
+        for name, metric in metrics:
+            lines.append("{0}: {1} calls, {2:.1f}ms total, p50 {3:.2f}ms, p99 {4:.2f}ms, max {5:.2f}ms, {6} docs".format(
+                name, metric.count, metric.total * 1000, metric.percentile(0.5) * 1000,
+                metric.percentile(0.99) * 1000, metric.max * 1000, metric.documents))
+        return "\n".join(lines)
+
+
+class LogSink:
+
+    # logs every call slower than threshold seconds.
+    def __init__(self, threshold=0.0, logger=None):
+        self.threshold = threshold
+        self.logger = logger or logging.getLogger("karaoke.metrics")
+
+    def record(self, name, seconds, documents):
+        if seconds >= self.threshold:
+            self.logger.info("%s took %.2fms (%s docs)", name, seconds * 1000, documents)
+
+    def flush(self):
+        pass
+
+
+class PrometheusSink(Stats):
+
+    # rewrites a Prometheus text-format file, for the node exporter's textfile collector, every interval seconds.
+    def __init__(self, path, interval=10.0):
+        super().__init__()
+        self.path = path
+        self.interval = interval
+        self.written = perf_counter()
+
+    def record(self, name, seconds, documents):
+        super().record(name, seconds, documents)
+        if perf_counter() - self.written >= self.interval:
+            self.flush()
+
+    def flush(self):
+        lines = ["# TYPE karaoke_call_seconds histogram", "# TYPE karaoke_call_documents counter"]
+        with self.lock:
+            self.written = perf_counter()  # set first, so other threads do not start a flush of their own.
+            for name, metric in sorted(self.metrics.items()):
+                cumulative = 0
+                for bound, hits in zip(CONST_BUCKETS, metric.buckets):
+                    cumulative += hits
+                    lines.append('karaoke_call_seconds_bucket{{call="{0}",le="{1}"}} {2}'.format(name, bound,
+                                                                                                  cumulative))
+                lines.append('karaoke_call_seconds_bucket{{call="{0}",le="+Inf"}} {1}'.format(name, metric.count))
+                lines.append('karaoke_call_seconds_sum{{call="{0}"}} {1}'.format(name, metric.total))
+                lines.append('karaoke_call_seconds_count{{call="{0}"}} {1}'.format(name, metric.count))
+                lines.append('karaoke_call_documents{{call="{0}"}} {1}'.format(name, metric.documents))
+
+        # a temporary file per process and thread, so concurrent flushes never rename each other's file.
+        temporary = "{0}.{1}.{2}.tmp".format(self.path, os.getpid(), get_ident())
+        try:
+            with open(temporary, "w") as handle:
+                handle.write("\n".join(lines) + "\n")
+            os.replace(temporary, self.path)  # the collector never sees a half written file.
+        except OSError as e:
+            logging.getLogger("karaoke.metrics").warning("Could not write %s: %s", self.path, e)
+
+
+def record(name, seconds, documents=None):
+    for sink in _sinks:
+        sink.record(name, seconds, documents)
+
+
+def documents_in(result):
+    if result is None:
+        return 0
+    if isinstance(result, dict):
+        return 1
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def timed_generator(name, generator, began):
+    count = 0
+    try:
+        for item in generator:
+            count += 1
+            yield item
+    finally:
+        record(name, perf_counter() - began, count)
+
+
+def wrap(name, function, counts_documents):
+    @wraps(function)
+    def timed(*args, **kwargs):
+        began = perf_counter()
+        result = function(*args, **kwargs)
+        if isinstance(result, GeneratorType):
+            # a generator's cost is paid while it is consumed, so it is timed until exhausted.
+            return timed_generator(name, result, began)
+        record(name, perf_counter() - began, documents_in(result) if counts_documents else None)
+        return result
+    return timed
+
+
+def patch(cls, attribute, name, counts_documents=False):
+    original = cls.__dict__[attribute]
+    function = original.__func__ if isinstance(original, staticmethod) else original
+    wrapped = wrap(name, function, counts_documents)
+    setattr(cls, attribute, staticmethod(wrapped) if isinstance(original, staticmethod) else wrapped)
+    _originals.append((cls, attribute, original))
+
+
+def enable(sinks):
+    # wraps MongoController calls and MainController menu steps; controllers built afterwards report to sinks.
+    from app.controllers.main_controller import MainController
+    from app.controllers.mongo_controller import MongoController
+
+    disable()
+    _sinks.extend(sinks)
+    for attribute in CONST_MONGO_METHODS:
+        patch(MongoController, attribute, "mongo." + attribute, counts_documents=True)
+    for state in MainController.CONST_STATES:
+        patch(MainController, "render_" + state, "menu.render_" + state)
+        patch(MainController, "handle_" + state, "menu.handle_" + state)
+    return sinks
+
+
+def disable():
+    flush()
+    while _originals:
+        cls, attribute, original = _originals.pop()
+        setattr(cls, attribute, original)
+    del _sinks[:]
+
+
+def flush():
+    for sink in _sinks:
+        sink.flush()
+
+
+def enable_from_config():
+    sinks = []
+    for sink in config.METRICS_SINKS.split(","):
+        sink = sink.strip()
+        if sink == "log":
+            logging.basicConfig(level=logging.INFO)
+            sinks.append(LogSink(config.METRICS_SLOW_MS / 1000.0))
+        elif sink == "prometheus":
+            sinks.append(PrometheusSink(config.METRICS_PROMETHEUS_PATH, config.METRICS_INTERVAL))
+    if sinks:
+        enable(sinks)
+        atexit.register(flush)
+    return sinks
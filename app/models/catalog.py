@@ -0,0 +1,60 @@
+class CatalogPage:
+
+    def __init__(self, songs, offset=0, token=None, next_token=None):
+        self.songs = songs
+        self.offset = offset  # number of songs that come before this page.
+        self.token = token  # token that fetched this page, None for the first page.
+        self.next_token = next_token  # token for the following page, None on the last page.
+
+    def __iter__(self):
+        return iter(self.songs)
+
+    def __len__(self):
+        return len(self.songs)
+
+    def has_next(self):
+        return self.next_token is not None
+
+
+class Catalog:
+
+    # Constants
+    CONST_DEFAULT_PAGE_SIZE = 50
+
+    def __init__(self, source, page_size=CONST_DEFAULT_PAGE_SIZE):
+        # source is anything with a get_page(token, page_size, offset) method, usually a MongoController.
+        self.source = source
+        self.page_size = page_size
+        self.page = None
+        self.history = []  # (token, offset) of the pages before the current one.
+
+    def current(self):
+        if self.page is None:
+            self.page = self.source.get_page(None, self.page_size)
+        return self.page
+
+    def next(self):
+        page = self.current()
+        if page.has_next():
+            self.history.append((page.token, page.offset))
+            self.page = self.source.get_page(page.next_token, self.page_size, page.offset + len(page))
+        return self.page
+
+    def prev(self):
+        self.current()
+        if self.history:
+            token, offset = self.history.pop()
+            self.page = self.source.get_page(token, self.page_size, offset)
+        return self.page
+
+    def reset(self):
+        self.page = None
+        del self.history[:]
+
+    def song(self, number):
+        # number is the 1-based position shown in the menus.
+        page = self.current()
+        index = number - 1 - page.offset
+        if 0 <= index < len(page):
+            return page.songs[index]
+        return None
@@ -0,0 +1,318 @@
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from time import monotonic
+from zlib import crc32
+from app.models.catalog import CatalogPage
+from app.models.search_index import SearchIndex
+from app.models.song import Song
+from app.models.song_table import SongView
+
+
+class CatalogSegment:
+
+    # Constants
+    CONST_ENCODING = "utf-8"
+    CONST_MAGIC = b"KARAOKE2"
+    CONST_ID_SIZE = 24  # ObjectId hex strings.
+    # header: magic, song count, then (offset, length) of every section in CONST_SECTIONS order. Numbers are in
+    # the host's byte order, a segment is only ever read on the machine that wrote it.
+    # The search index is stored too: its vocabulary, each word's song rows, and the one-deletion variants of the
+    # words with the words they came from, so kiosks search the segment without building an index of their own.
+    CONST_SECTIONS = ("ids", "title_offsets", "titles", "link_offsets", "links", "artist_offsets", "artists",
+                      "artist_column", "slots", "word_offsets", "words", "posting_offsets", "postings",
+                      "variant_offsets", "variants", "variant_word_offsets", "variant_words")
+    CONST_FORMATS = {"title_offsets": "Q", "link_offsets": "Q", "artist_offsets": "Q", "artist_column": "I",
+                     "slots": "I", "word_offsets": "Q", "posting_offsets": "Q", "postings": "I",
+                     "variant_offsets": "Q", "variant_word_offsets": "Q", "variant_words": "I"}
+    CONST_HEADER = struct.Struct("=8sQ" + "QQ" * len(CONST_SECTIONS))
+
+    def __init__(self, path):
+        # a read-only memory map of a file written by write(); the columns are views into the map, so attaching
+        # copies nothing and every process on the host shares the same pages.
+        with open(path, "rb") as handle:
+            self.stat = os.fstat(handle.fileno())
+            self.map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.map)
+        header = self.CONST_HEADER.unpack_from(view)
+        if header[0] != self.CONST_MAGIC:
+            raise ValueError("{0} is not a catalog segment".format(path))
+        self.count = header[1]
+        for number, name in enumerate(self.CONST_SECTIONS):
+            offset, length = header[2 + 2 * number], header[3 + 2 * number]
+            section = view[offset:offset + length]
+            if name in self.CONST_FORMATS:
+                section = section.cast(self.CONST_FORMATS[name])
+            setattr(self, name, section)
+        self.index = None
+
+    @classmethod
+    def write(cls, path, rows):
+        # rows are (id, title, artist, youtube) tuples sorted by id. The file is built next to path and moved over
+        # it in one rename, so a reader sees either the old segment or the new one, never a mix.
+        ids = bytearray()
+        titles, title_offsets = bytearray(), array("Q", [0])
+        links, link_offsets = bytearray(), array("Q", [0])
+        artists, artist_offsets, artist_ids = bytearray(), array("Q", [0]), {}
+        artist_column = array("I")
+        keys = []
+        index = SearchIndex()
+        for song_id, title, artist, youtube in rows:
+            index.add(Song(title, artist, youtube))
+            ids += song_id.encode("ascii")
+            title_bytes = title.encode(cls.CONST_ENCODING)
+            titles += title_bytes
+            title_offsets.append(len(titles))
+            links += youtube.encode(cls.CONST_ENCODING)
+            link_offsets.append(len(links))
+            artist_bytes = artist.encode(cls.CONST_ENCODING)
+            artist_id = artist_ids.get(artist_bytes)
+            if artist_id is None:
+                artist_id = artist_ids[artist_bytes] = len(artist_ids)
+                artists += artist_bytes
+                artist_offsets.append(len(artists))
+            artist_column.append(artist_id)
+            keys.append(cls.hash(title_bytes, artist_bytes))
+
+        # open addressing table of (title, artist) -> row + 1, at most half full so probes stay short.
+        slots = array("I", [0]) * cls.slot_count(len(keys))
+        mask = len(slots) - 1
+        for row, key in enumerate(keys):
+            slot = key & mask
+            while slots[slot]:
+                slot = (slot + 1) & mask
+            slots[slot] = row + 1
+
+        index.rebuild()
+        word_offsets, words = cls.pack_strings(index.vocabulary)
+        posting_offsets, postings = cls.pack_lists(index.postings[word] for word in index.vocabulary)
+        word_ids = {word: number for number, word in enumerate(index.vocabulary)}
+        variant_keys = sorted(index.deletes)
+        variant_offsets, variants = cls.pack_strings(variant_keys)
+        variant_word_offsets, variant_words = cls.pack_lists([word_ids[word] for word in index.deletes[variant]]
+                                                             for variant in variant_keys)
+        del index
+
+        sections = [bytes(ids), title_offsets, titles, link_offsets, links, artist_offsets, artists, artist_column,
+                    slots, word_offsets, words, posting_offsets, postings, variant_offsets, variants,
+                    variant_word_offsets, variant_words]
+        positions = []
+        position = cls.CONST_HEADER.size
+        for section in sections:
+            length = len(section) * getattr(section, "itemsize", 1)
+            position += -position % 8  # every column starts 8-byte aligned so it can be cast in place.
+            positions += [position, length]
+            position += length
+
+        temporary = "{0}.{1}.tmp".format(path, os.getpid())
+        with open(temporary, "wb") as handle:
+            handle.write(cls.CONST_HEADER.pack(cls.CONST_MAGIC, len(keys), *positions))
+            for number, section in enumerate(sections):
+                handle.write(b"\0" * (positions[2 * number] - handle.tell()))
+                handle.write(section)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temporary, path)
+        return len(keys)
+
+    @classmethod
+    def pack_strings(cls, strings):
+        offsets, data = array("Q", [0]), bytearray()
+        for string in strings:
+            data += string.encode(cls.CONST_ENCODING)
+            offsets.append(len(data))
+        return offsets, data
+
+    @staticmethod
+    def pack_lists(lists):
+        offsets, data = array("Q", [0]), array("I")
+        for values in lists:
+            data.extend(values)
+            offsets.append(len(data))
+        return offsets, data
+
+    @staticmethod
+    def slot_count(count):
+        size = 8
+        while size < 2 * count:
+            size *= 2
+        return size
+
+    @staticmethod
+    def hash(title_bytes, artist_bytes):
+        # crc32 rather than hash(), which is salted differently in every process.
+        return crc32(artist_bytes, crc32(title_bytes + b"\0"))
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("song index out of range")
+        return SongView(self, index)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield SongView(self, index)
+
+    def song_id(self, index):
+        return bytes(self.ids[index * self.CONST_ID_SIZE:(index + 1) * self.CONST_ID_SIZE]).decode("ascii")
+
+    def title(self, index):
+        return str(self.titles[self.title_offsets[index]:self.title_offsets[index + 1]], self.CONST_ENCODING)
+
+    def artist(self, index):
+        artist_id = self.artist_column[index]
+        return str(self.artists[self.artist_offsets[artist_id]:self.artist_offsets[artist_id + 1]],
+                   self.CONST_ENCODING)
+
+    def link(self, index):
+        return str(self.links[self.link_offsets[index]:self.link_offsets[index + 1]], self.CONST_ENCODING)
+
+    def after(self, token):
+        # index of the first song whose id sorts after token, by binary search over the id column.
+        token = token.encode("ascii")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if bytes(self.ids[middle * self.CONST_ID_SIZE:(middle + 1) * self.CONST_ID_SIZE]) <= token:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def search_index(self):
+        # a SearchIndex over the stored index sections, made once per segment and costing no copies.
+        if self.index is None:
+            self.index = SegmentIndex(self)
+        return self.index
+
+    def find(self, title, artist):
+        title_bytes, artist_bytes = title.encode(self.CONST_ENCODING), artist.encode(self.CONST_ENCODING)
+        mask = len(self.slots) - 1
+        slot = self.hash(title_bytes, artist_bytes) & mask
+        while self.slots[slot]:
+            index = self.slots[slot] - 1
+            if self.title(index) == title and self.artist(index) == artist:
+                return SongView(self, index)
+            slot = (slot + 1) & mask
+        return None
+
+
+class StoredStrings:
+
+    # a sorted list of strings kept as utf-8 bytes and offsets; bisect works on it like on a list.
+    def __init__(self, offsets, data, encoding):
+        self.offsets = offsets
+        self.data = data
+        self.encoding = encoding
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[number] for number in range(*position.indices(len(self)))]
+        return str(self.data[self.offsets[position]:self.offsets[position + 1]], self.encoding)
+
+    def find(self, string):
+        position = bisect_left(self, string)
+        if position < len(self) and self[position] == string:
+            return position
+        return None
+
+
+class StoredLists:
+
+    # maps the strings of a StoredStrings to runs of a stored integer column, read only like a dict of lists.
+    def __init__(self, keys, offsets, values, convert=None):
+        self.keys = keys
+        self.offsets = offsets
+        self.values = values
+        self.convert = convert  # applied to each value, turns word numbers back into words.
+
+    def __contains__(self, key):
+        return self.keys.find(key) is not None
+
+    def __getitem__(self, key):
+        position = self.keys.find(key)
+        if position is None:
+            raise KeyError(key)
+        values = self.values[self.offsets[position]:self.offsets[position + 1]]
+        return [self.convert(value) for value in values] if self.convert else values
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class SegmentIndex(SearchIndex):
+
+    # the search index a publisher stored in a segment; searching reads the mapped file in place.
+    def __init__(self, segment):
+        self.songs = segment
+        self.vocabulary = StoredStrings(segment.word_offsets, segment.words, segment.CONST_ENCODING)
+        self.postings = StoredLists(self.vocabulary, segment.posting_offsets, segment.postings)
+        variants = StoredStrings(segment.variant_offsets, segment.variants, segment.CONST_ENCODING)
+        self.deletes = StoredLists(variants, segment.variant_word_offsets, segment.variant_words,
+                                   self.vocabulary.__getitem__)
+
+    def add(self, song):
+        raise TypeError("a stored search index is read only, publish a new segment instead")
+
+
+class SharedCatalog:
+
+    # Constants
+    CONST_CHECK_INTERVAL = 1.0  # seconds between checks for a newly published segment.
+    CONST_BATCH_SIZE = 1000
+
+    def __init__(self, path, check_interval=CONST_CHECK_INTERVAL):
+        # a catalog source, like CatalogCache, that reads the segment a publisher keeps at path. Pages already handed
+        # out keep the segment they came from mapped, so a swap never pulls songs out from under a menu.
+        self.path = path
+        self.check_interval = check_interval
+        self.current = CatalogSegment(path)
+        self.checked = monotonic()
+        self.generation = 0  # goes up on every swap.
+
+    def segment(self):
+        if monotonic() - self.checked >= self.check_interval:
+            self.checked = monotonic()
+            try:
+                stat = os.stat(self.path)
+                if (stat.st_ino, stat.st_mtime_ns) != (self.current.stat.st_ino, self.current.stat.st_mtime_ns):
+                    self.current = CatalogSegment(self.path)
+                    self.generation += 1
+            except (OSError, ValueError) as e:
+                print("Could not attach the new catalog segment, still using the current one.")
+                print(e)
+        return self.current
+
+    def __len__(self):
+        return len(self.segment())
+
+    def iter_songs(self, batch_size=CONST_BATCH_SIZE):
+        return iter(self.segment())
+
+    def get_page(self, token=None, page_size=CONST_BATCH_SIZE, offset=0):
+        # tokens are song ids, so a page token from one segment carries on in the next.
+        segment = self.segment()
+        start = segment.after(token) if token else 0
+        end = min(start + page_size, len(segment))
+        next_token = segment.song_id(end - 1) if end < len(segment) else None
+        return CatalogPage([segment[index] for index in range(start, end)], offset, token, next_token)
+
+    def search_index(self):
+        return self.segment().search_index()
+
+    def get_songs(self, keys):
+        segment = self.segment()
+        songs = [segment.find(title, artist) for title, artist in keys]
+        return [song for song in songs if song is not None]
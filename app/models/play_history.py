@@ -0,0 +1,185 @@
+import heapq
+import json
+from datetime import datetime, timedelta, timezone
+from threading import Lock, Thread
+
+
+class TopN:
+
+    # counts every key and keeps the n most counted ones, so a chart never has to look at all of them.
+    def __init__(self, size):
+        self.size = size
+        self.counts = {}
+        self.top = {}  # key -> count for the current top n.
+        self.heap = []  # (count, key) entries for top, stale ones are skipped when they reach the front.
+
+    def add(self, key):
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        if key in self.top or len(self.top) < self.size:
+            self.top[key] = count
+            self.push(count, key)
+            return
+
+        # counts only go up by one, so a key enters the top n by passing its smallest member.
+        smallest, smallest_key = self.smallest()
+        if count > smallest:
+            del self.top[smallest_key]
+            heapq.heappop(self.heap)
+            self.top[key] = count
+            self.push(count, key)
+
+    def push(self, count, key):
+        heapq.heappush(self.heap, (count, key))
+        if len(self.heap) > 4 * self.size:
+            self.heap = [(value, name) for name, value in self.top.items()]
+            heapq.heapify(self.heap)
+
+    def smallest(self):
+        while self.heap[0][0] != self.top.get(self.heap[0][1]):
+            heapq.heappop(self.heap)
+        return self.heap[0]
+
+    def get(self, key):
+        return self.counts.get(key, 0)
+
+    def chart(self, limit=None):
+        ranked = sorted(self.top.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit else ranked
+
+
+class Popularity:
+
+    # Constants
+    CONST_CHART_SIZE = 50
+    CONST_NIGHT_STARTS = 12  # hour of the day a karaoke night starts, plays after midnight count for that night.
+    CONST_WINDOWS = ("tonight", "month", "all")
+
+    def __init__(self, size=CONST_CHART_SIZE):
+        self.size = size
+        self.windows = {window: (None, TopN(size)) for window in self.CONST_WINDOWS}
+
+    @staticmethod
+    def local(played_at):
+        # plays are stored in UTC; nights and months follow the venue's clock, the host's time zone (or TZ).
+        return played_at.replace(tzinfo=timezone.utc).astimezone()
+
+    def bucket(self, window, played_at):
+        if window == "tonight":
+            return (self.local(played_at) - timedelta(hours=self.CONST_NIGHT_STARTS)).date()
+        elif window == "month":
+            played_at = self.local(played_at)
+            return played_at.year, played_at.month
+        return None
+
+    def month_start(self, now):
+        # in UTC, from the start of the night the local month's first play can belong to.
+        start = self.local(now).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        start -= timedelta(hours=24 - self.CONST_NIGHT_STARTS)
+        return start.astimezone(timezone.utc).replace(tzinfo=None)
+
+    def add(self, key, played_at):
+        for window, (bucket, counter) in self.windows.items():
+            current = self.bucket(window, played_at)
+            if current != bucket:
+                if bucket is not None and current < bucket:
+                    continue  # a late event from a window that is already closed.
+                counter = TopN(self.size)
+                self.windows[window] = (current, counter)
+            counter.add(key)
+
+    def chart(self, window, limit=None, now=None):
+        bucket, counter = self.windows[window]
+        if bucket != self.bucket(window, now or datetime.utcnow()):
+            return []  # nothing has been played in this window yet.
+        return counter.chart(limit)
+
+    def get(self, key):
+        # play count since the history was loaded, used to sort search results.
+        return self.windows["all"][1].get(key)
+
+
+class FileSink:
+
+    # appends plays to a JSON lines file, for kiosks that should not write to Mongo.
+    def __init__(self, path):
+        self.path = path
+
+    def insert_plays(self, events):
+        with open(self.path, "a", encoding="utf-8") as handle:
+            for title, artist, played_at in events:
+                handle.write(json.dumps({"title": title, "artist": artist, "played_at": played_at.isoformat()}) + "\n")
+
+    def get_plays(self, since):
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                for line in handle:
+                    event = json.loads(line)
+                    played_at = datetime.fromisoformat(event["played_at"])
+                    if played_at >= since:
+                        yield event["title"], event["artist"], played_at
+        except FileNotFoundError:
+            return
+
+
+class PlayHistory:
+
+    # Constants
+    CONST_BATCH_SIZE = 100
+
+    def __init__(self, sink, batch_size=CONST_BATCH_SIZE, popularity=None):
+        # sink has insert_plays(events) and get_plays(since); events are (title, artist, played_at) tuples.
+        # Without a sink the charts still work, but only for plays since this process started.
+        self.sink = sink
+        self.batch_size = batch_size
+        self.popularity = popularity or Popularity()
+        self.buffer = []
+        self.lock = Lock()
+
+    def load(self, now=None):
+        # replays this month's plays into the counters once, at startup.
+        if self.sink is None:
+            return self
+        now = now or datetime.utcnow()
+        try:
+            for title, artist, played_at in self.sink.get_plays(self.popularity.month_start(now)):
+                with self.lock:
+                    self.popularity.add((title, artist), played_at)
+        except Exception as e:
+            print("Could not load the play history, charts start empty.")
+            print(e)
+        return self
+
+    def load_in_background(self):
+        # charts fill in while the menus are already up; plays recorded meanwhile are counted as usual.
+        Thread(target=self.load, daemon=True).start()
+        return self
+
+    def record(self, song, played_at=None):
+        played_at = played_at or datetime.utcnow()
+        key = (song.get_title(), song.get_artist())
+        with self.lock:
+            self.popularity.add(key, played_at)
+            self.buffer.append(key + (played_at,))
+            if len(self.buffer) < self.batch_size:
+                return
+            batch, self.buffer = self.buffer, []
+        # the write happens off the playing thread, so a play never waits on the sink.
+        Thread(target=self.write, args=(batch,), daemon=True).start()
+
+    def flush(self):
+        with self.lock:
+            batch, self.buffer = self.buffer, []
+        if batch:
+            self.write(batch)
+
+    def write(self, batch):
+        if self.sink is None:
+            return
+        try:
+            self.sink.insert_plays(batch)
+        except Exception as e:
+            print("Could not save {0} play(s): {1}".format(len(batch), e))
+
+    def chart(self, window, limit=None):
+        return self.popularity.chart(window, limit)
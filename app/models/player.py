@@ -1,19 +1,33 @@
+from app.models.playlist import Playlist
+
+
 class Player:
 
-    def __init__(self):
-        self.queue = set()
+    def __init__(self, allow_duplicates=False, history=None):
+        self.queue = Playlist(allow_duplicates)
+        self.history = history  # a PlayHistory that records every song played, if any.
 
     def play(self, song_to_play):
         print("Now playing: '{0}' by {1}, official video at {2}".format
               (song_to_play.get_title(), song_to_play.get_artist(), song_to_play.get_link()))
+        if self.history is not None:
+            self.history.record(song_to_play)
 
     def add(self, song):
-        self.queue.add(song)
-        print("Song '{0}' added to playlist".format(song.get_title()))
+        entry = self.queue.append(song)
+        if entry is None:
+            print("Song '{0}' is already in the playlist".format(song.get_title()))
+        else:
+            print("Song '{0}' added to playlist".format(song.get_title()))
+        return entry
+
+    def remove(self, entry):
+        self.queue.remove(entry)
+        print("Song '{0}' removed from playlist".format(entry.song.get_title()))
 
-    def remove(self, song):
-        self.queue.remove(song)
-        print("Song '{0}' removed from playlist".format(song.get_title()))
+    def move_to_front(self, entry):
+        self.queue.move_to_front(entry)
+        print("Song '{0}' moved to the top of the playlist".format(entry.song.get_title()))
 
     def queue_play(self):
         for song in self.queue:
@@ -0,0 +1,124 @@
+class PlaylistEntry:
+
+    # a handle to one position in a Playlist, used to remove or move that song without searching for it.
+    __slots__ = ("song", "prev", "next", "playlist")
+
+    def __init__(self, song, playlist):
+        self.song = song
+        self.prev = None
+        self.next = None
+        self.playlist = playlist
+
+
+class Playlist:
+
+    def __init__(self, allow_duplicates=False):
+        self.allow_duplicates = allow_duplicates
+        self.head = None
+        self.tail = None
+        self.size = 0
+        self.keys = {}  # (title, artist) -> number of entries, for duplicate checks.
+        self.positions = None  # entries in order, rebuilt on the first positional lookup after a change.
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for entry in self.entries():
+            yield entry.song
+
+    def __contains__(self, song):
+        return self.key(song) in self.keys
+
+    def __getitem__(self, position):
+        if self.positions is None:
+            self.positions = list(self.entries())
+        return self.positions[position]
+
+    @staticmethod
+    def key(song):
+        return song.get_title(), song.get_artist()
+
+    def entries(self):
+        entry = self.head
+        while entry is not None:
+            yield entry
+            entry = entry.next
+
+    def append(self, song):
+        # returns the new entry, or None when the song is already listed and duplicates are not allowed.
+        key = self.key(song)
+        if not self.allow_duplicates and key in self.keys:
+            return None
+        entry = PlaylistEntry(song, self)
+        self.link(entry, self.tail)
+        self.keys[key] = self.keys.get(key, 0) + 1
+        self.size += 1
+        return entry
+
+    def remove(self, entry):
+        self.check(entry)
+        self.unlink(entry)
+        entry.playlist = None
+        key = self.key(entry.song)
+        self.keys[key] -= 1
+        if not self.keys[key]:
+            del self.keys[key]
+        self.size -= 1
+
+    def move_to_front(self, entry):
+        self.move_after(entry, None)
+
+    def move_to_next(self, entry):
+        # puts the entry right behind the first song, so it plays after the one that is up now.
+        if entry is self.head:
+            self.move_after(entry, entry.next)
+        else:
+            self.move_after(entry, self.head)
+
+    def move_after(self, entry, anchor):
+        # anchor None moves the entry to the front.
+        self.check(entry)
+        if anchor is entry or entry.prev is anchor:
+            return
+        self.unlink(entry)
+        self.link(entry, anchor)
+
+    def clear(self):
+        for entry in self.entries():
+            entry.playlist = None
+        self.head = None
+        self.tail = None
+        self.size = 0
+        self.keys.clear()
+        self.positions = None
+
+    def check(self, entry):
+        if entry.playlist is not self:
+            raise ValueError("entry is not in this playlist")
+
+    def link(self, entry, anchor):
+        entry.prev = anchor
+        entry.next = self.head if anchor is None else anchor.next
+        if entry.next is None:
+            self.tail = entry
+        else:
+            entry.next.prev = entry
+        if anchor is None:
+            self.head = entry
+        else:
+            anchor.next = entry
+        self.positions = None
+
+    def unlink(self, entry):
+        if entry.prev is None:
+            self.head = entry.next
+        else:
+            entry.prev.next = entry.next
+        if entry.next is None:
+            self.tail = entry.prev
+        else:
+            entry.next.prev = entry.prev
+        entry.prev = None
+        entry.next = None
+        self.positions = None
@@ -0,0 +1,143 @@
+import heapq
+import re
+from bisect import bisect_left
+from app.models.song_key import fold
+from app.models.song_table import SongTable
+
+
+class SearchIndex:
+
+    # Constants
+    CONST_DEFAULT_LIMIT = 10
+    CONST_SCORE_EXACT = 3
+    CONST_SCORE_PREFIX = 2
+    CONST_SCORE_FUZZY = 1
+    CONST_POPULARITY_POOL = 5  # matches looked at per result when sorting by popularity.
+    CONST_FUZZY_MIN_LENGTH = 4  # shorter tokens match too much when a typo is allowed.
+    CONST_PREFIX_LIMIT = 50  # words a one-word prefix query expands to at most, so it stays fast on a big catalog.
+    CONST_FILTER_COST = 20  # posting entries worth walking per candidate before checking candidates' words instead.
+    CONST_TOKEN_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, songs=()):
+        self.songs = SongTable()
+        self.postings = {}  # token -> list of song ids, in catalog order.
+        self.deletes = {}  # token with one character removed -> tokens it came from.
+        self.vocabulary = []  # sorted tokens, searched with bisect for prefix lookups.
+        for song in songs:
+            self.add(song)
+        self.rebuild()
+
+    def __len__(self):
+        return len(self.songs)
+
+    @classmethod
+    def normalize(cls, text):
+        return cls.CONST_TOKEN_PATTERN.findall(fold(text))
+
+    @staticmethod
+    def variants(token):
+        return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+    def add(self, song):
+        # call rebuild() after a run of add() calls so prefix and fuzzy lookups see the new tokens.
+        song_id = len(self.songs)
+        self.songs.append(song)
+        for token in set(self.normalize(song.get_title()) + self.normalize(song.get_artist())):
+            self.postings.setdefault(token, []).append(song_id)
+
+    def rebuild(self):
+        self.vocabulary = sorted(self.postings)
+        self.deletes = {}
+        for token in self.vocabulary:
+            if len(token) >= self.CONST_FUZZY_MIN_LENGTH:
+                for variant in self.variants(token):
+                    self.deletes.setdefault(variant, []).append(token)
+
+    def prefixed(self, prefix, limit=None):
+        # vocabulary words starting with prefix, the first limit of them in alphabetical order when limit is set.
+        start = bisect_left(self.vocabulary, prefix)
+        high = len(self.vocabulary) if limit is None else min(start + limit, len(self.vocabulary))
+        end = bisect_left(self.vocabulary, prefix + "\U0010ffff", start, high)
+        return self.vocabulary[start:end]
+
+    def fuzzy(self, token):
+        # tokens within one insert, delete or substitution of the query token.
+        if len(token) < self.CONST_FUZZY_MIN_LENGTH - 1:
+            return set()
+        matches = set(self.deletes.get(token, ()))
+        for variant in self.variants(token):
+            if variant in self.postings and len(variant) >= self.CONST_FUZZY_MIN_LENGTH:
+                matches.add(variant)
+            matches.update(self.deletes.get(variant, ()))
+        matches.discard(token)
+        return matches
+
+    def match(self, token, is_prefix):
+        scores = {}
+        matches = [(token, self.CONST_SCORE_EXACT)]
+        if is_prefix:
+            # nothing narrows a lone prefix down, so only its first words are expanded; the results are still
+            # matches, and typing another letter reaches the rest.
+            matches += [(word, self.CONST_SCORE_PREFIX) for word in self.prefixed(token, self.CONST_PREFIX_LIMIT)
+                        if word != token]
+        if len(matches) == 1 and token not in self.postings:
+            matches = [(word, self.CONST_SCORE_FUZZY) for word in self.fuzzy(token)]
+
+        for word, score in matches:
+            for song_id in self.postings.get(word, ()):
+                if scores.get(song_id, 0) < score:
+                    scores[song_id] = score
+        return scores
+
+    def match_within(self, prefix, candidates):
+        # scores the last, still typed, token of a longer query only against songs the earlier tokens matched,
+        # so every word it starts is considered without expanding the whole vocabulary.
+        words = self.prefixed(prefix)
+        if not words:
+            return {song_id: score for song_id, score in self.match(prefix, False).items() if song_id in candidates}
+
+        scores = {}
+        postings = sum(len(self.postings[word]) for word in words)
+        if postings <= self.CONST_FILTER_COST * len(candidates):
+            for word in words:
+                score = self.CONST_SCORE_EXACT if word == prefix else self.CONST_SCORE_PREFIX
+                for song_id in self.postings[word]:
+                    if song_id in candidates and scores.get(song_id, 0) < score:
+                        scores[song_id] = score
+            return scores
+
+        # fewer candidates than postings to walk, so their own words are checked instead.
+        for song_id in candidates:
+            tokens = self.normalize(self.songs.title(song_id)) + self.normalize(self.songs.artist(song_id))
+            if prefix in tokens:
+                scores[song_id] = self.CONST_SCORE_EXACT
+            elif any(token.startswith(prefix) for token in tokens):
+                scores[song_id] = self.CONST_SCORE_PREFIX
+        return scores
+
+    def search(self, query, limit=CONST_DEFAULT_LIMIT, popularity=None):
+        tokens = self.normalize(query)
+        if not tokens:
+            return []
+
+        # the last token is still being typed, so it is matched as a prefix of the words in songs the others matched.
+        totals = None
+        for position, token in enumerate(tokens):
+            last = position == len(tokens) - 1
+            if totals is None:
+                totals = self.match(token, last)
+            else:
+                scores = self.match_within(token, totals) if last else self.match(token, False)
+                totals = {song_id: total + scores[song_id] for song_id, total in totals.items() if song_id in scores}
+            if not totals:
+                return []
+
+        if popularity is None:
+            best = heapq.nsmallest(limit, totals.items(), key=lambda item: (-item[1], item[0]))
+            return [self.songs[song_id] for song_id, score in best]
+
+        # popularity breaks ties among the best matches; only those few songs are looked up.
+        best = heapq.nsmallest(limit * self.CONST_POPULARITY_POOL, totals.items(), key=lambda item: (-item[1], item[0]))
+        songs = [(score, self.songs[song_id]) for song_id, score in best]
+        songs.sort(key=lambda item: (-item[0], -popularity.get((item[1].get_title(), item[1].get_artist()))))
+        return [song for score, song in songs[:limit]]
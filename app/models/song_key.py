@@ -0,0 +1,29 @@
+import re
+import unicodedata
+
+# Two songs are the same catalog entry when their canonical keys match: case, accents, punctuation,
+# spacing and featured artists are ignored, so "Bohemian Rhapsody" / "Queen" and "bohemian rhapsody " / "QUEEN"
+# share one key.
+
+# Constants
+CONST_SEPARATOR = "|"
+# "(feat x)", "feat. x", "ft. x" or "featuring x" and everything after it; a bare "feat" can be a real word.
+CONST_FEATURING = re.compile(r"\s*(?:[\(\[]\s*(?:feat|ft|featuring)\b|\b(?:feat\.|ft\.|featuring\b)).*$")
+CONST_APOSTROPHES = re.compile(r"['\u2019]")
+CONST_PUNCTUATION = re.compile(r"[^\w\s]|_")
+
+
+def fold(text):
+    # casefolds and drops accents, "Énergie" becomes "energie".
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def clean(text):
+    text = CONST_APOSTROPHES.sub("", CONST_FEATURING.sub("", fold(text)))
+    text = CONST_PUNCTUATION.sub(" ", text.replace("&", " and "))
+    return " ".join(text.split())
+
+
+def canonical_key(title, artist):
+    return clean(title) + CONST_SEPARATOR + clean(artist)
@@ -0,0 +1,91 @@
+from array import array
+from sys import intern
+
+
+class SongView:
+
+    # a row of a SongTable, created on access so the table never holds per-song objects.
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, SongView) and self.table is other.table and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.table), self.index))
+
+    def get_title(self):
+        return self.table.title(self.index)
+
+    def get_artist(self):
+        return self.table.artist(self.index)
+
+    def get_link(self):
+        return self.table.link(self.index)
+
+
+class SongTable:
+
+    # Constants
+    CONST_ENCODING = "utf-8"
+
+    def __init__(self):
+        # titles and links are utf-8 bytes packed end to end; offsets[i]:offsets[i + 1] is row i.
+        self.titles = bytearray()
+        self.title_offsets = array("Q", [0])
+        self.links = bytearray()
+        self.link_offsets = array("Q", [0])
+        # artists repeat a lot, so each row only stores the id of an interned artist string.
+        self.artists = []
+        self.artist_ids = {}
+        self.artist_column = array("L")
+
+    @classmethod
+    def from_songs(cls, songs):
+        table = cls()
+        for song in songs:
+            table.append(song)
+        return table
+
+    def __len__(self):
+        return len(self.artist_column)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("song index out of range")
+        return SongView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield SongView(self, index)
+
+    def add(self, title, artist, youtube):
+        self.titles += title.encode(self.CONST_ENCODING)
+        self.title_offsets.append(len(self.titles))
+        self.links += youtube.encode(self.CONST_ENCODING)
+        self.link_offsets.append(len(self.links))
+
+        artist_id = self.artist_ids.get(artist)
+        if artist_id is None:
+            artist_id = len(self.artists)
+            self.artists.append(intern(artist))
+            self.artist_ids[self.artists[artist_id]] = artist_id
+        self.artist_column.append(artist_id)
+        return SongView(self, len(self) - 1)
+
+    def append(self, song):
+        return self.add(song.get_title(), song.get_artist(), song.get_link())
+
+    def title(self, index):
+        return self.titles[self.title_offsets[index]:self.title_offsets[index + 1]].decode(self.CONST_ENCODING)
+
+    def artist(self, index):
+        return self.artists[self.artist_column[index]]
+
+    def link(self, index):
+        return self.links[self.link_offsets[index]:self.link_offsets[index + 1]].decode(self.CONST_ENCODING)
@@ -0,0 +1,96 @@
+import sys
+from io import StringIO
+from threading import local
+
+
+class SongListView:
+
+    # Constants
+    CONST_PAGE_SIZE = 20
+    CONST_CACHE_SIZE = 100000  # formatted lines kept before the cache starts over.
+    CONST_LINE = "Title: {0}, Artist: {1}, Link:{2}"
+
+    def __init__(self, page_size=CONST_PAGE_SIZE):
+        self.page_size = page_size
+        self.lines = {}  # (title, artist) -> (link, formatted line)
+
+    def line(self, song):
+        # a song whose link changed is formatted again, every other song reuses its line.
+        key = (song.get_title(), song.get_artist())
+        link = song.get_link()
+        cached = self.lines.get(key)
+        if cached is None or cached[0] != link:
+            if len(self.lines) >= self.CONST_CACHE_SIZE:
+                self.lines.clear()
+            cached = self.lines[key] = (link, self.CONST_LINE.format(key[0], key[1], link))
+        return cached[1]
+
+    def invalidate(self, song):
+        self.lines.pop((song.get_title(), song.get_artist()), None)
+
+    def format(self, songs, count=1):
+        lines = []
+        for number, song in enumerate(songs, count):
+            lines.append(str(number) + ". " + self.line(song))
+        return "\n".join(lines)
+
+    def page_count(self, songs):
+        return max((len(songs) + self.page_size - 1) // self.page_size, 1)
+
+    def page(self, songs, number):
+        # returns the songs on page number (clamped to the pages there are) and how many songs come before it.
+        number = min(max(number, 0), self.page_count(songs) - 1)
+        start = number * self.page_size
+        return songs[start:start + self.page_size], start
+
+
+class ThreadOutput:
+
+    # stands in for sys.stdout, so a thread can collect what it prints without redirecting any other thread.
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = local()
+
+    @classmethod
+    def install(cls):
+        if not isinstance(sys.stdout, cls):
+            sys.stdout = cls(sys.stdout)
+        return sys.stdout
+
+    def targets(self):
+        # buffers this thread is printing into, innermost last.
+        targets = getattr(self.local, "targets", None)
+        if targets is None:
+            targets = self.local.targets = []
+        return targets
+
+    def target(self):
+        targets = self.targets()
+        return targets[-1] if targets else self.stream
+
+    def write(self, text):
+        return self.target().write(text)
+
+    def flush(self):
+        self.target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class Screen:
+
+    # collects everything printed while it is open and writes it out in one go when it closes.
+    def __init__(self):
+        self.buffer = StringIO()
+
+    def __enter__(self):
+        self.output = ThreadOutput.install()
+        self.output.targets().append(self.buffer)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.output.targets().pop()
+        self.output.write(self.buffer.getvalue())
+        self.output.flush()
+        return False
@@ -0,0 +1,54 @@
+from argparse import ArgumentParser
+from time import perf_counter
+from app.controllers import mongo_client
+from app.controllers.import_controller import ImportController
+from app.controllers.mongo_controller import MongoController
+from benchmarks.memory_mongo import MemoryDatabase
+
+CONST_ROUND_TRIP = 0.0005  # seconds, roughly a LAN round trip to mongod.
+CONST_BENCH_DB_NAME = "karaoke_bench"
+
+
+def synthetic_rows(count):
+    for number in range(count):
+        yield {MongoController.CONST_PROPERTY_TITLE: "Song title number {0}".format(number),
+               MongoController.CONST_PROPERTY_ARTIST: "Artist {0}".format(number % 5000),
+               MongoController.CONST_PROPERTY_YOUTUBE: "https://www.youtube.com/watch?v={0:011d}".format(number)}
+
+
+def controller(mongod, latency):
+    if mongod:
+        mongo_client.get_client().drop_database(CONST_BENCH_DB_NAME)
+        return MongoController(mongo_client.get_client()[CONST_BENCH_DB_NAME])
+    return MongoController(MemoryDatabase(CONST_BENCH_DB_NAME, latency))
+
+
+def per_row(mongo, count):
+    began = perf_counter()
+    for row in synthetic_rows(count):
+        mongo.insert_song(row[MongoController.CONST_PROPERTY_TITLE], row[MongoController.CONST_PROPERTY_ARTIST],
+                          row[MongoController.CONST_PROPERTY_YOUTUBE])
+    return count / (perf_counter() - began)
+
+
+def bulk(mongo, count, batch_size):
+    report = ImportController(mongo, batch_size).run(synthetic_rows(count))
+    return report.rows_per_second()
+
+
+def main():
+    parser = ArgumentParser(description="Compare per-row insert_song against the bulk import pipeline.")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=ImportController.CONST_DEFAULT_BATCH_SIZE)
+    parser.add_argument("--mongod", action="store_true", help="use the local mongod instead of the stand-in.")
+    parser.add_argument("--latency", type=float, default=CONST_ROUND_TRIP, help="stand-in round trip in seconds.")
+    args = parser.parse_args()
+
+    single = per_row(controller(args.mongod, args.latency), args.rows)
+    batched = bulk(controller(args.mongod, args.latency), args.rows, args.batch_size)
+    print("per-row insert_song: {0:>10.0f} rows/sec".format(single))
+    print("bulk import:         {0:>10.0f} rows/sec ({1:.1f}x)".format(batched, batched / single))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import asyncio
+import resource
+import statistics
+from argparse import ArgumentParser
+from time import perf_counter
+import config
+
+# One pass through the menus per session; the last command returns to the main menu.
+CONST_SCRIPT = ("1", "1", "main", "2", "1", "add", "2", "remove", "1", "main", "4", "song 12", "main")
+CONST_PROMPT = b"\n> "
+
+
+async def session(host, port, rounds, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        await reader.readuntil(CONST_PROMPT)
+        for _ in range(rounds):
+            for command in CONST_SCRIPT:
+                began = perf_counter()
+                writer.write(command.encode() + b"\n")
+                await writer.drain()
+                await reader.readuntil(CONST_PROMPT)
+                latencies.append(perf_counter() - began)
+    finally:
+        writer.close()
+
+
+async def run(args):
+    latencies = []
+    began = perf_counter()
+    results = await asyncio.gather(*[session(args.host, args.port, args.rounds, latencies)
+                                     for _ in range(args.sessions)], return_exceptions=True)
+    elapsed = perf_counter() - began
+    failed = [result for result in results if isinstance(result, Exception)]
+
+    latencies.sort()
+    print("{0} sessions, {1} commands in {2:.1f}s ({3:.0f} commands/sec), {4} failed sessions".format(
+        args.sessions, len(latencies), elapsed, len(latencies) / elapsed, len(failed)))
+    if latencies:
+        print("p50 {0:.2f}ms, p99 {1:.2f}ms, max {2:.2f}ms".format(
+            statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99)] * 1000, latencies[-1] * 1000))
+
+
+def main():
+    parser = ArgumentParser(description="Simulate many concurrent sessions against serve.py.")
+    parser.add_argument("--host", default=config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    # each session holds a socket open, so make sure the file descriptor limit allows for all of them.
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
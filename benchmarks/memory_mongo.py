@@ -0,0 +1,228 @@
+from datetime import datetime
+from time import sleep
+from bson.objectid import ObjectId
+
+
+class MemoryResult:
+
+    def __init__(self, matched_count=0, upserted_count=0, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = matched_count
+        self.upserted_count = upserted_count
+        self.upserted_id = upserted_id
+
+
+class MemoryCursor:
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __iter__(self):
+        return iter(self.documents)
+
+    def sort(self, key, direction=1):
+        self.documents = sorted(self.documents, key=lambda document: document[key], reverse=direction < 0)
+        return self
+
+    def limit(self, size):
+        self.documents = self.documents[:size] if size else self.documents
+        return self
+
+    def batch_size(self, size):
+        return self
+
+
+class MemoryCollection:
+
+    # an in-process stand-in for the parts of a pymongo Collection the controllers use.
+    # latency is slept once per call to stand in for the network round trip to mongod.
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.documents = {}  # _id -> document, in insertion order.
+        self.indexes = {}  # sorted index fields -> {field values: {_id: None}} for equality lookups.
+
+    def round_trip(self):
+        if self.latency:
+            sleep(self.latency)
+
+    @staticmethod
+    def key(fields, document):
+        return tuple(document.get(field) for field in fields)
+
+    def reindex(self, document, remove=False):
+        for fields, index in self.indexes.items():
+            ids = index.setdefault(self.key(fields, document), {})
+            if remove:
+                del ids[document["_id"]]
+            else:
+                ids[document["_id"]] = None
+
+    @staticmethod
+    def matches(document, query):
+        for key, value in query.items():
+            if isinstance(value, dict):
+                if "$exists" in value and (key in document) != value["$exists"]:
+                    return False
+                if "$type" in value and not isinstance(document.get(key), str):
+                    return False  # only the "string" type is used.
+                if key not in document and ("$gt" in value or "$gte" in value):
+                    return False
+                if "$gt" in value and not document[key] > value["$gt"]:
+                    return False
+                if "$gte" in value and not document[key] >= value["$gte"]:
+                    return False
+                if "$in" in value and document.get(key) not in value["$in"]:
+                    return False
+            elif document.get(key) != value:
+                return False
+        return True
+
+    def create_index(self, keys, **kwargs):
+        self.round_trip()
+        fields = tuple(sorted(key for key, direction in keys))
+        index = self.indexes[fields] = {}
+        for document in self.documents.values():
+            index.setdefault(self.key(fields, document), {})[document["_id"]] = None
+        return "_".join(str(part) for key in keys for part in key)
+
+    def select(self, query):
+        if list(query) == ["$or"]:
+            found = {}
+            for clause in query["$or"]:
+                for document in self.select(clause):
+                    found[document["_id"]] = document
+            return list(found.values())
+        fields = tuple(sorted(query))
+        if fields in self.indexes and not any(isinstance(value, dict) for value in query.values()):
+            return [self.documents[document_id] for document_id in self.indexes[fields].get(self.key(fields, query), ())]
+        return [document for document in self.documents.values() if self.matches(document, query)]
+
+    def lookup(self, query):
+        found = self.select(query)
+        return found[0] if found else None
+
+    def find(self, query=None, projection=None):
+        self.round_trip()
+        found = self.select(query or {})
+        if projection and any(projection.values()):
+            found = [{key: value for key, value in document.items()
+                      if key in projection and projection[key] or key == "_id" and projection.get(key, 1)}
+                     for document in found]
+        elif projection:
+            found = [{key: value for key, value in document.items() if key not in projection} for document in found]
+        return MemoryCursor(found)
+
+    def find_one(self, query=None, projection=None):
+        for document in self.find(query, projection):
+            return document
+        return None
+
+    def count_documents(self, query):
+        self.round_trip()
+        return len(self.select(query))
+
+    def replace_one(self, query, replacement, upsert=False):
+        self.round_trip()
+        return self.upsert(query, dict(replacement), upsert)
+
+    def update_one(self, query, update, upsert=False):
+        self.round_trip()
+        return self.upsert(query, self.fields(update), upsert, merge=True, on_insert=update.get("$setOnInsert"))
+
+    def update_many(self, query, update):
+        self.round_trip()
+        fields = self.fields(update)
+        documents = self.select(query)
+        for document in documents:
+            self.reindex(document, remove=True)
+            document.update(fields)
+            self.reindex(document)
+        return MemoryResult(matched_count=len(documents))
+
+    def delete_many(self, query):
+        self.round_trip()
+        for document in self.select(query):
+            del self.documents[document["_id"]]
+            self.reindex(document, remove=True)
+
+    @staticmethod
+    def fields(update):
+        fields = dict(update.get("$set", {}))
+        for key in update.get("$currentDate", {}):
+            fields[key] = datetime.utcnow()
+        return fields
+
+    def upsert(self, query, fields, upsert, merge=False, on_insert=None):
+        existing = self.lookup(query)
+        if existing is not None:
+            document = self.documents[existing["_id"]]
+            self.reindex(document, remove=True)
+            if not merge:
+                document_id = document["_id"]
+                document.clear()
+                document["_id"] = document_id
+            document.update(fields)
+            self.reindex(document)
+            return MemoryResult(matched_count=1)
+        if not upsert:
+            return MemoryResult()
+        document = dict((key, value) for key, value in query.items()
+                        if not key.startswith("$") and not isinstance(value, dict))
+        document.update(on_insert or {})
+        document.update(fields)
+        document.setdefault("_id", ObjectId())
+        self.documents[document["_id"]] = document
+        self.reindex(document)
+        return MemoryResult(upserted_count=1, upserted_id=document["_id"])
+
+    def insert_many(self, documents, ordered=True):
+        self.round_trip()
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+            self.documents[document["_id"]] = document
+            self.reindex(document)
+
+    def bulk_write(self, requests, ordered=True):
+        self.round_trip()
+        result = MemoryResult()
+        for request in requests:
+            # pymongo's write models keep their arguments in _filter, _doc and _upsert.
+            operation = type(request).__name__
+            if operation == "UpdateOne":
+                single = self.upsert(request._filter, self.fields(request._doc), request._upsert, merge=True,
+                                     on_insert=request._doc.get("$setOnInsert"))
+            elif operation == "UpdateMany":
+                single = self.update_many(request._filter, request._doc)
+            elif operation == "DeleteOne":
+                self.delete_one(request._filter)
+                continue
+            else:
+                self.delete_many(request._filter)
+                continue
+            result.matched_count += single.matched_count
+            result.upserted_count += single.upserted_count
+        return result
+
+    def delete_one(self, query):
+        existing = self.lookup(query)
+        if existing is not None:
+            del self.documents[existing["_id"]]
+            self.reindex(existing, remove=True)
+
+
+class MemoryDatabase:
+
+    def __init__(self, name="karaoke", latency=0.0):
+        self.name = name
+        self.latency = latency
+        self.collections = {}
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = MemoryCollection(self.latency)
+        return self.collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from argparse import ArgumentParser
+from app.models.catalog_segment import CatalogSegment
+from benchmarks.song_memory import synthetic_songs
+
+CONST_SIZES = (10000, 100000, 1000000)
+
+# Runs in a fresh interpreter so each measurement is one kiosk process starting up.
+CONST_PROBE = """
+import json
+import tracemalloc
+from time import perf_counter
+from app.models.catalog import Catalog
+from app.models.catalog_segment import CatalogSegment, SharedCatalog
+from app.models.search_index import SearchIndex
+from app.models.song_table import SongTable
+if TRACE:
+    tracemalloc.start()
+began = perf_counter()
+if SHARED:
+    source = SharedCatalog(PATH)
+    catalog = Catalog(source)
+else:
+    catalog = SongTable.from_songs(CatalogSegment(PATH))  # what every kiosk held before: its own full copy.
+loaded = perf_counter()
+index = source.search_index() if SHARED else SearchIndex(catalog)  # the first search.
+index.search("4242")  # a title number, as selective as a typical search.
+searched = perf_counter()
+print(json.dumps({"startup": loaded - began, "search": searched - loaded, "heap": tracemalloc.get_traced_memory()[0]}))
+"""
+
+
+def run(path, shared, trace):
+    probe = CONST_PROBE.replace("SHARED", repr(shared)).replace("PATH", repr(path)).replace("TRACE", repr(trace))
+    output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def rows(count):
+    for number, song in enumerate(synthetic_songs(count)):
+        yield ("{0:024x}".format(number),) + song
+
+
+def main():
+    parser = ArgumentParser(description="Per-kiosk startup, first search and memory with a private catalog copy "
+                                        "versus the shared catalog segment.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=CONST_SIZES)
+    args = parser.parse_args()
+
+    print("{0:>10} {1:>8} {2:>12} {3:>14} {4:>12}".format("songs", "mode", "startup", "first search", "heap"))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalog.segment")
+        for count in args.sizes:
+            CatalogSegment.write(path, rows(count))
+            for shared in (False, True):
+                # tracing slows allocation down, so time and memory come from separate runs.
+                timings = run(path, shared, False)
+                heap = run(path, shared, True)["heap"]
+                print("{0:>10} {1:>8} {2:>10.1f}ms {3:>12.1f}ms {4:>10.1f}MB".format(
+                    count, "shared" if shared else "private", timings["startup"] * 1000, timings["search"] * 1000,
+                    heap / 1e6))
+
+
+if __name__ == "__main__":
+    main()
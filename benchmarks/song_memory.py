@@ -0,0 +1,47 @@
+import gc
+import tracemalloc
+from app.models.song import Song
+from app.models.song_table import SongTable
+
+CONST_SIZES = (10000, 100000, 1000000)
+CONST_ARTISTS = 5000  # distinct artists in the synthetic catalog.
+
+
+def synthetic_songs(count):
+    for number in range(count):
+        yield ("Song title number {0}".format(number),
+               "Artist {0}".format(number % CONST_ARTISTS),
+               "https://www.youtube.com/watch?v={0:011d}".format(number))
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    catalog = build()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del catalog
+    return size
+
+
+def song_list(count):
+    return [Song(title, artist, youtube) for title, artist, youtube in synthetic_songs(count)]
+
+
+def song_table(count):
+    table = SongTable()
+    for title, artist, youtube in synthetic_songs(count):
+        table.add(title, artist, youtube)
+    return table
+
+
+def main():
+    print("{0:>10} {1:>14} {2:>14} {3:>8}".format("songs", "Song list", "SongTable", "ratio"))
+    for count in CONST_SIZES:
+        objects = measure(lambda: song_list(count))
+        table = measure(lambda: song_table(count))
+        print("{0:>10} {1:>12.1f}MB {2:>12.1f}MB {3:>7.1f}x".format(count, objects / 1e6, table / 1e6, objects / table))
+
+
+if __name__ == "__main__":
+    main()
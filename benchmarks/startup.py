@@ -0,0 +1,44 @@
+import json
+import statistics
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+# Runs in a fresh interpreter each time so every measurement is a cold start.
+CONST_PROBE = """
+import json
+from time import perf_counter
+began = perf_counter()
+from app.controllers.main_controller import MainController
+imported = perf_counter()
+controller = MainController()
+constructed = perf_counter()
+timings = {"import": imported - began, "construct": constructed - imported}
+if FIRST_PAGE:
+    controller.catalog.current()
+    timings["first_page"] = perf_counter() - constructed
+print(json.dumps(timings))
+"""
+
+
+def run(first_page):
+    probe = CONST_PROBE.replace("FIRST_PAGE", repr(first_page))
+    output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = ArgumentParser(description="Measure kiosk cold start: imports, MainController() and the first menu page.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--first-page", action="store_true", help="also fetch the first catalog page from mongod.")
+    args = parser.parse_args()
+
+    runs = [run(args.first_page) for _ in range(args.runs)]
+    for phase in runs[0]:
+        values = [timings[phase] for timings in runs]
+        print("{0:>10}: median {1:8.2f}ms, max {2:8.2f}ms".format(phase, statistics.median(values) * 1000,
+                                                                 max(values) * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import os
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from itertools import cycle
+from time import perf_counter
+from app.controllers.catalog_cache import CatalogCache
+from app.controllers.main_controller import MainController
+from app.models.catalog import Catalog
+
+# A session that walks every menu and never powers off; one entry per prompt.
+CONST_SCRIPT = ("1", "1", "y", "next", "2", "main",
+                "2", "1", "add", "2", "add", "3", "move", "3", "remove", "1", "play", "play", "x", "main",
+                "4", "song 1", "1", "main", "4", "artst 7", "search", "zzzz", "main",
+                "9", "main")
+CONST_SAMPLES = 10
+
+
+def controller(songs):
+    # an in-memory snapshot stands in for the kiosk's catalog, so no Mongo is needed.
+    cache = CatalogCache(None, ":memory:")
+    CatalogCache.store(cache.connection, [("{0:024x}".format(number), "Song {0}".format(number),
+                                           "Artist {0}".format(number % 50), "https://youtu.be/{0}".format(number))
+                                          for number in range(songs)])
+    return MainController(Catalog(cache, page_size=10))
+
+
+def main():
+    parser = ArgumentParser(description="Drive the menu state machine from a script and watch memory stay flat.")
+    parser.add_argument("--transitions", type=int, default=1000000)
+    parser.add_argument("--songs", type=int, default=200)
+    args = parser.parse_args()
+
+    kiosk = controller(args.songs)
+    script = cycle(CONST_SCRIPT)
+    read = lambda prompt: next(script)
+    state = kiosk.CONST_STATE_START
+    sample_every = max(args.transitions // CONST_SAMPLES, 1)
+
+    tracemalloc.start()
+    began = perf_counter()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for number in range(1, args.transitions + 1):
+            state = kiosk.step(state, read)
+            if number % sample_every == 0:
+                size, peak = tracemalloc.get_traced_memory()
+                print("{0:>10} transitions, {1:8.0f}/sec, {2:8.1f}KB traced".format(
+                    number, number / (perf_counter() - began), size / 1024.0), file=sys.stderr)
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import json
+import os
+import random
+import sys
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from time import perf_counter
+from app.controllers import mongo_client
+from app.controllers.main_controller import MainController
+from app.controllers.mongo_controller import MongoController
+from app.models.catalog import Catalog
+from app.models.player import Player
+from benchmarks.memory_mongo import MemoryDatabase
+
+CONST_SIZES = (1000, 10000, 100000, 1000000)
+CONST_BENCH_DB_NAME = "karaoke_bench"
+CONST_LOOKUPS = 1000  # get_song and insert_song calls per measurement.
+CONST_QUEUE_SIZE = 200  # a busy night's playlist.
+CONST_TOLERANCE = 0.25  # slower than baseline by more than this fraction is a regression.
+
+
+def synthetic_songs(count):
+    return [{MongoController.CONST_PROPERTY_TITLE: "Song title number {0}".format(number),
+             MongoController.CONST_PROPERTY_ARTIST: "Artist {0}".format(number % 5000),
+             MongoController.CONST_PROPERTY_YOUTUBE: "https://www.youtube.com/watch?v={0:011d}".format(number)}
+            for number in range(count)]
+
+
+def catalog(size, mongod):
+    if mongod:
+        mongo_client.get_client().drop_database(CONST_BENCH_DB_NAME)
+        mongo = MongoController(mongo_client.get_client()[CONST_BENCH_DB_NAME])
+    else:
+        mongo = MongoController(MemoryDatabase(CONST_BENCH_DB_NAME))
+    songs = synthetic_songs(size)
+    for start in range(0, size, 10000):
+        mongo.songsCollections.insert_many(songs[start:start + 10000])
+    return mongo, songs
+
+
+def timed(repeat, call, *args):
+    # best of repeat runs, the least noisy estimate on a shared box.
+    best = None
+    for _ in range(repeat):
+        began = perf_counter()
+        call(*args)
+        elapsed = perf_counter() - began
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def lookups(mongo, songs):
+    for song in random.Random(1).sample(songs, min(CONST_LOOKUPS, len(songs))):
+        mongo.get_song(song[MongoController.CONST_PROPERTY_TITLE], song[MongoController.CONST_PROPERTY_ARTIST])
+
+
+def inserts(mongo, songs):
+    for song in random.Random(2).sample(songs, min(CONST_LOOKUPS, len(songs))):
+        mongo.insert_song(song[MongoController.CONST_PROPERTY_TITLE], song[MongoController.CONST_PROPERTY_ARTIST],
+                          song[MongoController.CONST_PROPERTY_YOUTUBE])
+
+
+def render_page(mongo):
+    MainController.options(Catalog(mongo).current())
+
+
+def queue_round_trip(songs):
+    player = Player()
+    entries = [player.add(song) for song in songs[:CONST_QUEUE_SIZE]]
+    player.queue_play()
+    for entry in entries:
+        player.remove(entry)
+
+
+def measure(size, mongod, repeat):
+    mongo, songs = catalog(size, mongod)
+    table = mongo.get_all_songs()
+    results = {
+        "get_all_songs": timed(repeat, mongo.get_all_songs),
+        "get_song": timed(repeat, lookups, mongo, songs),
+        "insert_song": timed(repeat, inserts, mongo, songs),
+        "options_page": timed(repeat, render_page, mongo),
+        "options_full": timed(repeat, MainController.options, table),
+        "player_queue": timed(repeat, queue_round_trip, list(table)),
+    }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for size, timings in results.items():
+        for name, seconds in timings.items():
+            before = baseline.get(size, {}).get(name)
+            if before and seconds > before * (1 + tolerance):
+                regressions.append("{0} at {1} songs: {2:.4f}s, baseline {3:.4f}s (+{4:.0%})".format(
+                    name, size, seconds, before, seconds / before - 1))
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description="Time catalog, menu and queue paths on synthetic catalogs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=CONST_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mongod", action="store_true", help="use the local mongod instead of the stand-in.")
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--baseline", help="results of an earlier run; slower timings fail the run.")
+    parser.add_argument("--tolerance", type=float, default=CONST_TOLERANCE)
+    args = parser.parse_args()
+
+    results = {}
+    with open(os.devnull, "w") as devnull:
+        for size in args.sizes:
+            with redirect_stdout(devnull):
+                results[str(size)] = measure(size, args.mongod, args.repeat)
+            for name, seconds in sorted(results[str(size)].items()):
+                print("{0:>8} songs {1:>14}: {2:10.4f}s".format(size, name, seconds))
+
+    with open(args.output, "w") as handle:
+        json.dump(results, handle, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        for regression in regressions:
+            print("REGRESSION: " + regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
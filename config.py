@@ -0,0 +1,42 @@
+import os
+
+# Every setting can be overridden with an environment variable of the same name.
+MONGO_HOST = os.environ.get("MONGO_HOST", "localhost")
+MONGO_PORT = int(os.environ.get("MONGO_PORT", "27017"))
+# Credentials have no default, set them (or MONGO_URI) in the environment.
+MONGO_USERNAME = os.environ.get("MONGO_USERNAME", "")
+MONGO_PASSWORD = os.environ.get("MONGO_PASSWORD", "")
+MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME", "karaoke")
+MONGO_URI = os.environ.get("MONGO_URI", "")  # when set, used instead of host, port, username and password.
+
+# Connection pool and timeouts, in milliseconds.
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "20"))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "2000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "3000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+
+# Local catalog snapshot, so kiosks start without waiting for Mongo and keep working through outages.
+CATALOG_SNAPSHOT_PATH = os.environ.get("CATALOG_SNAPSHOT_PATH", "catalog.sqlite3")
+# Deleted songs only leave the snapshot on a full refresh; one runs once the last is this old.
+CATALOG_FULL_REFRESH_HOURS = float(os.environ.get("CATALOG_FULL_REFRESH_HOURS", "24"))
+
+# Shared catalog segment written by publish_catalog.py, e.g. /dev/shm/karaoke-catalog. When set, kiosks on the
+# host map it instead of each loading their own copy of the catalog.
+CATALOG_SEGMENT_PATH = os.environ.get("CATALOG_SEGMENT_PATH", "")
+CATALOG_PUBLISH_INTERVAL = float(os.environ.get("CATALOG_PUBLISH_INTERVAL", "60"))  # seconds between refreshes.
+
+# Multi-session server mode (serve.py).
+SERVER_HOST = os.environ.get("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.environ.get("SERVER_PORT", "7777"))
+SERVER_MAX_SESSIONS = int(os.environ.get("SERVER_MAX_SESSIONS", "2000"))
+SERVER_IDLE_TIMEOUT = float(os.environ.get("SERVER_IDLE_TIMEOUT", "1800"))  # seconds.
+
+# Call latency metrics, off unless METRICS_SINKS lists "log" and/or "prometheus" (comma separated).
+METRICS_SINKS = os.environ.get("METRICS_SINKS", "")
+METRICS_SLOW_MS = float(os.environ.get("METRICS_SLOW_MS", "50"))  # the log sink only reports calls this slow.
+METRICS_PROMETHEUS_PATH = os.environ.get("METRICS_PROMETHEUS_PATH", "karaoke.prom")
+METRICS_INTERVAL = float(os.environ.get("METRICS_INTERVAL", "10"))  # seconds between Prometheus file rewrites.
+
+# Play history for the popularity charts; written to Mongo unless a JSON lines file is given here.
+PLAY_HISTORY_PATH = os.environ.get("PLAY_HISTORY_PATH", "")
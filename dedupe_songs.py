@@ -0,0 +1,18 @@
+from argparse import ArgumentParser
+from app.controllers.dedupe_controller import DedupeController
+from app.controllers.mongo_controller import MongoController
+import config
+
+parser = ArgumentParser(description="Merge songs that only differ in case, spacing, punctuation, accents or "
+                                    "featured artists, and build the unique canonical key index.")
+parser.add_argument("--dry-run", action="store_true", help="report what would change without writing.")
+args = parser.parse_args()
+
+report = DedupeController(MongoController()).run(args.dry_run)
+
+print("{0} songs scanned, {1} given a canonical key, {2} duplicate groups, {3} songs {4}.".format(
+    report.songs, report.keyed, report.groups, report.removed, "to remove" if args.dry_run else "removed"))
+if not args.dry_run:
+    print("{0} playlists and {1} plays moved onto the kept songs.".format(report.playlists, report.plays))
+    print("Kiosks drop removed songs from their snapshot on the first start after it is {0:g} hours old "
+          "(CATALOG_FULL_REFRESH_HOURS).".format(config.CATALOG_FULL_REFRESH_HOURS))
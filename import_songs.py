@@ -0,0 +1,24 @@
+from argparse import ArgumentParser
+from app.controllers.import_controller import ImportController
+from app.controllers.mongo_controller import MongoController
+
+parser = ArgumentParser(description="Bulk import songs from a CSV or JSONL file with title, artist and youtube.")
+parser.add_argument("path")
+parser.add_argument("--start", type=int, default=0, help="row to resume from, as printed by a failed import.")
+parser.add_argument("--batch-size", type=int, default=ImportController.CONST_DEFAULT_BATCH_SIZE)
+parser.add_argument("--ordered", action="store_true", help="stop each batch at its first write error.")
+parser.add_argument("--skip-existing", action="store_true", help="leave songs already in the catalog untouched.")
+args = parser.parse_args()
+
+importer = ImportController(MongoController(), args.batch_size, args.ordered, args.skip_existing)
+report = importer.run(importer.read_rows(args.path), args.start)
+
+print("{0} rows in {1:.1f}s ({2:.0f} rows/sec): {3} new, {4} updated, {5} duplicates, {6} invalid".format(
+    report.rows, report.elapsed, report.rows_per_second(), report.upserted, report.matched, report.duplicates,
+    len(report.invalid)))
+for number, reason in report.invalid:
+    print("row {0}: {1}".format(number, reason))
+for number, details in report.batch_errors:
+    print("batch at row {0} failed: {1}".format(number, details))
+if not report.finished:
+    print("Import stopped early, resume with --start {0}".format(report.position))
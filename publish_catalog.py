@@ -0,0 +1,17 @@
+from argparse import ArgumentParser
+from app.controllers.catalog_publisher import CatalogPublisher
+from app.controllers.mongo_controller import MongoController
+import config
+
+parser = ArgumentParser(description="Publish the song catalog as a shared segment for the kiosks on this host "
+                                    "and keep it up to date.")
+parser.add_argument("--path", default=config.CATALOG_SEGMENT_PATH,
+                    help="segment file, /dev/shm keeps it in memory (default: CATALOG_SEGMENT_PATH).")
+parser.add_argument("--interval", type=float, default=config.CATALOG_PUBLISH_INTERVAL,
+                    help="seconds between catalog refreshes.")
+parser.add_argument("--once", action="store_true", help="publish once and exit.")
+args = parser.parse_args()
+if not args.path:
+    parser.error("set --path or CATALOG_SEGMENT_PATH")
+
+CatalogPublisher(MongoController(), args.path, args.interval).run(args.once)
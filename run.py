@@ -1,4 +1,6 @@
+from app import instrumentation
 from app.controllers.main_controller import MainController
 
+instrumentation.enable_from_config()
 start = MainController()
-start.main()
+start.run()
@@ -0,0 +1,6 @@
+import asyncio
+from app import instrumentation
+from app.controllers.server_controller import ServerController
+
+instrumentation.enable_from_config()
+asyncio.run(ServerController().serve_forever())
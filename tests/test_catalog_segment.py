@@ -0,0 +1,170 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from app.models.catalog import Catalog
+from app.models.catalog_segment import CatalogSegment, SharedCatalog
+from app.models.search_index import SearchIndex
+from app.models.song import Song
+
+
+def rows(count, start=0):
+    return [("{0:024x}".format(number * 2), "Title {0} é".format(number), "Artist {0}".format(number % 3),
+             "link {0}".format(number)) for number in range(start, start + count)]
+
+
+class CatalogSegmentTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "catalog.segment")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def segment(self, songs):
+        self.assertEqual(CatalogSegment.write(self.path, songs), len(songs))
+        return CatalogSegment(self.path)
+
+    def test_round_trip(self):
+        songs = rows(100)
+        segment = self.segment(songs)
+        self.assertEqual(len(segment), 100)
+        self.assertEqual([(segment.song_id(index), song.get_title(), song.get_artist(), song.get_link())
+                          for index, song in enumerate(segment)], songs)
+        self.assertEqual(segment[-1].get_title(), "Title 99 é")
+        with self.assertRaises(IndexError):
+            segment[100]
+
+    def test_artists_are_stored_once(self):
+        segment = self.segment(rows(30))
+        self.assertEqual(len(segment.artist_offsets), 4)
+        self.assertEqual(bytes(segment.artists), b"Artist 0Artist 1Artist 2")
+
+    def test_header_offsets_are_aligned(self):
+        self.segment(rows(7))
+        with open(self.path, "rb") as handle:
+            data = handle.read()
+        header = CatalogSegment.CONST_HEADER.unpack_from(data)
+        self.assertEqual(header[0], CatalogSegment.CONST_MAGIC)
+        self.assertEqual(header[1], 7)
+        end = CatalogSegment.CONST_HEADER.size
+        for number in range(len(CatalogSegment.CONST_SECTIONS)):
+            offset, length = header[2 + 2 * number], header[3 + 2 * number]
+            self.assertEqual(offset % 8, 0)
+            self.assertGreaterEqual(offset, end)
+            end = offset + length
+        self.assertEqual(end, len(data))
+
+    def test_empty_catalog(self):
+        segment = self.segment([])
+        self.assertEqual(len(segment), 0)
+        self.assertEqual(list(segment), [])
+        self.assertEqual(segment.after("0" * 24), 0)
+        self.assertIsNone(segment.find("Title", "Artist"))
+
+    def test_not_a_segment(self):
+        with open(self.path, "wb") as handle:
+            handle.write(b"\0" * CatalogSegment.CONST_HEADER.size)
+        with self.assertRaises(ValueError):
+            CatalogSegment(self.path)
+
+    def test_after(self):
+        segment = self.segment(rows(10))  # ids are 0, 2, 4, ... 18.
+        self.assertEqual(segment.after("{0:024x}".format(0)), 1)
+        self.assertEqual(segment.after("{0:024x}".format(5)), 3)
+        self.assertEqual(segment.after("{0:024x}".format(18)), 10)
+        self.assertEqual(segment.after(""), 0)
+
+    def test_find(self):
+        songs = rows(1000)
+        segment = self.segment(songs)
+        for song_id, title, artist, link in songs[::37]:
+            self.assertEqual(segment.find(title, artist).get_link(), link)
+        self.assertIsNone(segment.find("Title 1 é", "Artist 2"))  # right title, wrong artist.
+        self.assertIsNone(segment.find("Missing", "Artist 0"))
+
+    def test_find_probes_past_collisions(self):
+        # every row shares one home slot, so all but the first are found by probing.
+        with mock.patch.object(CatalogSegment, "hash", staticmethod(lambda title_bytes, artist_bytes: 5)):
+            segment = self.segment(rows(6))
+            for song_id, title, artist, link in rows(6):
+                self.assertEqual(segment.find(title, artist).get_link(), link)
+            self.assertIsNone(segment.find("Missing", "Artist 0"))
+
+    def test_stored_search_index_matches_a_built_one(self):
+        songs = rows(200) + [("{0:024x}".format(1001), "Bohemian Rhapsody", "Queen", "q"),
+                             ("{0:024x}".format(1003), "Énergie", "Café Tacvba", "c")]
+        stored = self.segment(songs).search_index()
+        built = SearchIndex(Song(title, artist, link) for song_id, title, artist, link in songs)
+        for query in ("title", "title 1", "title 12 e", "artist 2 t", "bohem", "queen b", "rhapsodi", "energie",
+                      "cafe", "e", "missing"):
+            self.assertEqual([song.get_link() for song in stored.search(query, limit=20)],
+                             [song.get_link() for song in built.search(query, limit=20)], query)
+        self.assertEqual([song.get_title() for song in stored.search("queen bo")], ["Bohemian Rhapsody"])
+
+    def test_stored_search_index_is_read_only(self):
+        with self.assertRaises(TypeError):
+            self.segment(rows(3)).search_index().add(Song("Title", "Artist", "link"))
+
+    def test_empty_search_index(self):
+        self.assertEqual(self.segment([]).search_index().search("anything"), [])
+
+    def test_slots_are_at_most_half_full(self):
+        for count in (0, 4, 5, 1000):
+            size = CatalogSegment.slot_count(count)
+            self.assertEqual(size & (size - 1), 0)
+            self.assertGreaterEqual(size, 2 * count)
+
+
+class SharedCatalogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "catalog.segment")
+        CatalogSegment.write(self.path, rows(25))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_pages(self):
+        catalog = Catalog(SharedCatalog(self.path), 10)
+        self.assertEqual(catalog.current().songs[0].get_title(), "Title 0 é")
+        self.assertEqual(catalog.next().offset, 10)
+        last = catalog.next()
+        self.assertEqual((last.offset, len(last), last.has_next()), (20, 5, False))
+        self.assertEqual(catalog.prev().songs[0].get_title(), "Title 10 é")
+
+    def test_get_songs(self):
+        shared = SharedCatalog(self.path)
+        songs = shared.get_songs([("Title 3 é", "Artist 0"), ("Nope", "Artist 0"), ("Title 1 é", "Artist 1")])
+        self.assertEqual([song.get_link() for song in songs], ["link 3", "link 1"])
+
+    def test_swap(self):
+        shared = SharedCatalog(self.path, check_interval=0)
+        catalog = Catalog(shared, 10)
+        old = catalog.current()
+        catalog.next()
+        CatalogSegment.write(self.path, rows(5) + rows(30, 5))
+        os.utime(self.path, ns=(0, 0))  # a distinct mtime even on filesystems with coarse timestamps.
+        self.assertEqual(len(shared), 35)
+        self.assertEqual(shared.generation, 1)
+        self.assertEqual(old.songs[0].get_title(), "Title 0 é")  # the old page keeps its segment.
+        self.assertEqual(catalog.next().songs[0].get_title(), "Title 20 é")  # its token carries on.
+
+    def test_search_follows_the_swap(self):
+        shared = SharedCatalog(self.path, check_interval=0)
+        self.assertEqual(shared.search_index().search("replacement"), [])
+        CatalogSegment.write(self.path, [("{0:024x}".format(1), "Replacement", "Artist", "link")])
+        os.utime(self.path, ns=(0, 0))
+        self.assertEqual([song.get_title() for song in shared.search_index().search("replacement")], ["Replacement"])
+
+    def test_no_swap_without_a_new_file(self):
+        shared = SharedCatalog(self.path, check_interval=0)
+        shared.segment()
+        self.assertEqual(shared.generation, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import time
+import unittest
+from datetime import datetime
+from app.models.play_history import PlayHistory, Popularity, TopN
+from app.models.song import Song
+
+
+class TopNTest(unittest.TestCase):
+
+    def test_keeps_the_most_counted_keys(self):
+        top = TopN(2)
+        for key in "abcbcc":
+            top.add(key)
+        self.assertEqual(top.chart(), [("c", 3), ("b", 2)])
+        self.assertEqual(top.get("a"), 1)
+
+    def test_key_overtakes_the_smallest_member(self):
+        top = TopN(2)
+        for key in "aabbccc":
+            top.add(key)
+        chart = top.chart()
+        self.assertEqual(chart[0], ("c", 3))
+        self.assertEqual(chart[1][1], 2)
+        self.assertEqual(len(top.top), 2)
+
+    def test_ties_keep_the_member(self):
+        top = TopN(1)
+        for key in "ab":
+            top.add(key)
+        self.assertEqual(top.chart(), [("a", 1)])
+
+    def test_chart_limit_and_order(self):
+        top = TopN(3)
+        for key in "zyxzy":
+            top.add(key)
+        self.assertEqual(top.chart(2), [("y", 2), ("z", 2)])
+
+    def test_matches_a_full_count_under_churn(self):
+        # the heap is compacted along the way, the chart must still agree with counting everything.
+        top = TopN(5)
+        counts = {}
+        for number in range(5000):
+            key = (number * 7919) % 37 if number % 3 else number % 11
+            top.add(key)
+            counts[key] = counts.get(key, 0) + 1
+        expected = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:5]
+        self.assertEqual([count for key, count in top.chart()], [count for key, count in expected])
+        self.assertLessEqual(len(top.heap), 4 * top.size + 1)
+
+
+class PopularityTest(unittest.TestCase):
+
+    def setUp(self):
+        self.zone = os.environ.get("TZ")
+        os.environ["TZ"] = "Asia/Tokyo"  # UTC+9, no daylight saving.
+        time.tzset()
+
+    def tearDown(self):
+        if self.zone is None:
+            del os.environ["TZ"]
+        else:
+            os.environ["TZ"] = self.zone
+        time.tzset()
+
+    def test_night_follows_local_time(self):
+        popularity = Popularity()
+        popularity.add("early", datetime(2026, 10, 17, 11, 0))  # 20:00 in Tokyo.
+        popularity.add("late", datetime(2026, 10, 17, 17, 0))  # 02:00 the next day in Tokyo, still the same night.
+        chart = popularity.chart("tonight", now=datetime(2026, 10, 17, 18, 0))
+        self.assertEqual(sorted(key for key, count in chart), ["early", "late"])
+
+    def test_next_night_starts_empty(self):
+        popularity = Popularity()
+        popularity.add("early", datetime(2026, 10, 17, 11, 0))
+        self.assertEqual(popularity.chart("tonight", now=datetime(2026, 10, 18, 4, 0)), [])  # 13:00 next day.
+
+    def test_month_follows_local_time(self):
+        popularity = Popularity()
+        popularity.add("song", datetime(2026, 10, 31, 16, 0))  # already November 1st in Tokyo.
+        self.assertEqual(popularity.chart("month", now=datetime(2026, 11, 2)), [("song", 1)])
+
+    def test_month_start_covers_the_first_night(self):
+        start = Popularity().month_start(datetime(2026, 11, 15))
+        self.assertEqual(start, datetime(2026, 10, 31, 3, 0))  # noon on October 31st in Tokyo.
+
+
+class PlayHistoryTest(unittest.TestCase):
+
+    class Sink:
+
+        def __init__(self, plays):
+            self.plays = plays
+            self.written = []
+
+        def insert_plays(self, events):
+            self.written.extend(events)
+
+        def get_plays(self, since):
+            return [play for play in self.plays if play[2] >= since]
+
+    def test_load_replays_this_month(self):
+        now = datetime.utcnow()
+        sink = self.Sink([("Song", "Artist", now), ("Old", "Artist", datetime(2000, 1, 1))])
+        history = PlayHistory(sink).load(now)
+        self.assertEqual(history.popularity.get(("Song", "Artist")), 1)
+        self.assertEqual(history.popularity.get(("Old", "Artist")), 0)
+
+    def test_record_writes_in_batches(self):
+        sink = self.Sink([])
+        history = PlayHistory(sink, batch_size=100)
+        history.record(Song("Song", "Artist", "link"))
+        self.assertEqual(sink.written, [])
+        history.flush()
+        self.assertEqual([event[:2] for event in sink.written], [("Song", "Artist")])
+        self.assertEqual(history.chart("all"), [(("Song", "Artist"), 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
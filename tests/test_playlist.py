@@ -0,0 +1,129 @@
+import unittest
+from app.models.playlist import Playlist
+from app.models.song import Song
+
+
+def song(number):
+    return Song("Title {0}".format(number), "Artist", "link {0}".format(number))
+
+
+class PlaylistTest(unittest.TestCase):
+
+    def setUp(self):
+        self.playlist = Playlist()
+        self.entries = [self.playlist.append(song(number)) for number in range(4)]
+
+    def titles(self):
+        return [item.get_title() for item in self.playlist]
+
+    def assertLinked(self):
+        # walks both directions so a broken prev pointer shows up too.
+        forward = list(self.playlist.entries())
+        backward = []
+        entry = self.playlist.tail
+        while entry is not None:
+            backward.append(entry)
+            entry = entry.prev
+        self.assertEqual(forward, backward[::-1])
+        self.assertEqual(len(forward), len(self.playlist))
+        self.assertIs(self.playlist.head, forward[0] if forward else None)
+
+    def test_append_keeps_order(self):
+        self.assertEqual(self.titles(), ["Title 0", "Title 1", "Title 2", "Title 3"])
+        self.assertLinked()
+
+    def test_append_rejects_duplicates(self):
+        self.assertIsNone(self.playlist.append(song(1)))
+        self.assertEqual(len(self.playlist), 4)
+
+    def test_append_allows_duplicates(self):
+        playlist = Playlist(allow_duplicates=True)
+        first = playlist.append(song(1))
+        playlist.append(song(1))
+        playlist.remove(first)
+        self.assertIn(song(1), playlist)
+        self.assertEqual(len(playlist), 1)
+
+    def test_remove_head_middle_and_tail(self):
+        self.playlist.remove(self.entries[0])
+        self.playlist.remove(self.entries[2])
+        self.playlist.remove(self.entries[3])
+        self.assertEqual(self.titles(), ["Title 1"])
+        self.assertIs(self.playlist.tail, self.entries[1])
+        self.assertNotIn(song(0), self.playlist)
+        self.assertLinked()
+
+    def test_remove_single_entry(self):
+        playlist = Playlist()
+        entry = playlist.append(song(0))
+        playlist.remove(entry)
+        self.assertIsNone(playlist.head)
+        self.assertIsNone(playlist.tail)
+        self.assertEqual(list(playlist), [])
+
+    def test_remove_twice_raises(self):
+        self.playlist.remove(self.entries[1])
+        with self.assertRaises(ValueError):
+            self.playlist.remove(self.entries[1])
+
+    def test_entry_from_another_playlist_raises(self):
+        other = Playlist().append(song(9))
+        with self.assertRaises(ValueError):
+            self.playlist.move_to_front(other)
+
+    def test_move_tail_to_front(self):
+        self.playlist.move_to_front(self.entries[3])
+        self.assertEqual(self.titles(), ["Title 3", "Title 0", "Title 1", "Title 2"])
+        self.assertIs(self.playlist.tail, self.entries[2])
+        self.assertLinked()
+
+    def test_move_head_to_tail(self):
+        self.playlist.move_after(self.entries[0], self.entries[3])
+        self.assertEqual(self.titles(), ["Title 1", "Title 2", "Title 3", "Title 0"])
+        self.assertIs(self.playlist.head, self.entries[1])
+        self.assertLinked()
+
+    def test_move_to_own_position_is_a_no_op(self):
+        self.playlist.move_after(self.entries[2], self.entries[2])
+        self.playlist.move_after(self.entries[2], self.entries[1])
+        self.playlist.move_to_front(self.entries[0])
+        self.assertEqual(self.titles(), ["Title 0", "Title 1", "Title 2", "Title 3"])
+        self.assertLinked()
+
+    def test_move_to_next(self):
+        self.playlist.move_to_next(self.entries[3])
+        self.assertEqual(self.titles(), ["Title 0", "Title 3", "Title 1", "Title 2"])
+        self.playlist.move_to_next(self.entries[0])
+        self.assertEqual(self.titles(), ["Title 3", "Title 0", "Title 1", "Title 2"])
+        self.assertLinked()
+
+    def test_move_single_entry(self):
+        playlist = Playlist()
+        entry = playlist.append(song(0))
+        playlist.move_to_front(entry)
+        playlist.move_to_next(entry)
+        self.assertEqual(list(playlist.entries()), [entry])
+        self.assertIs(playlist.tail, entry)
+
+    def test_positions_follow_changes(self):
+        self.assertIs(self.playlist[1], self.entries[1])
+        self.playlist.remove(self.entries[0])
+        self.assertIs(self.playlist[0], self.entries[1])
+        self.playlist.move_to_front(self.entries[3])
+        self.assertIs(self.playlist[0], self.entries[3])
+        self.playlist.append(song(7))
+        self.assertEqual(self.playlist[-1].song.get_title(), "Title 7")
+        self.playlist.clear()
+        with self.assertRaises(IndexError):
+            self.playlist[0]
+
+    def test_clear_detaches_entries(self):
+        self.playlist.clear()
+        self.assertEqual(len(self.playlist), 0)
+        self.assertNotIn(song(0), self.playlist)
+        with self.assertRaises(ValueError):
+            self.playlist.remove(self.entries[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
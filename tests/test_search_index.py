@@ -0,0 +1,88 @@
+import unittest
+from app.models.play_history import Popularity
+from app.models.search_index import SearchIndex
+from app.models.song import Song
+
+
+def titles(songs):
+    return [song.get_title() for song in songs]
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        songs = [Song("Born {0}".format(chr(ord("a") + number // 26) + chr(ord("a") + number % 26)), "Band", "")
+                 for number in range(60)]  # 60 "bo..." words ahead of "bohemian" in the vocabulary.
+        songs += [Song("Bohemian Rhapsody", "Queen", "q1"),
+                  Song("Don't Stop Me Now", "Queen", "q2"),
+                  Song("Bohemian Like You", "The Dandy Warhols", "d1"),
+                  Song("The Lazy Song", "Bruno Mars", "b1"),
+                  Song("Énergie", "Café Tacvba", "c1")]
+        self.index = SearchIndex(songs)
+
+    def test_exact_word(self):
+        self.assertEqual(titles(self.index.search("rhapsody")), ["Bohemian Rhapsody"])
+
+    def test_prefix(self):
+        self.assertEqual(titles(self.index.search("rhaps")), ["Bohemian Rhapsody"])
+        self.assertEqual(sorted(titles(self.index.search("bohem"))), ["Bohemian Like You", "Bohemian Rhapsody"])
+
+    def test_exact_ranks_before_prefix(self):
+        index = SearchIndex([Song("Rock Lobster", "The B-52's", ""), Song("Rock", "Someone", "")])
+        self.assertEqual(titles(index.search("rock")), ["Rock Lobster", "Rock"])  # both exact, catalog order.
+        index = SearchIndex([Song("Rockstar", "Post Malone", ""), Song("Rock", "Someone", "")])
+        self.assertEqual(titles(index.search("rock")), ["Rock", "Rockstar"])
+
+    def test_accents_and_case(self):
+        self.assertEqual(titles(self.index.search("ENERGIE cafe")), ["Énergie"])
+
+    def test_fuzzy(self):
+        self.assertEqual(titles(self.index.search("rhapsodi")), ["Bohemian Rhapsody"])  # substitution.
+        self.assertEqual(titles(self.index.search("rapsody")), ["Bohemian Rhapsody"])  # deletion.
+        self.assertEqual(titles(self.index.search("rhapssody")), ["Bohemian Rhapsody"])  # insertion.
+        self.assertEqual(self.index.search("xyzzy"), [])
+
+    def test_multiple_words(self):
+        self.assertEqual(titles(self.index.search("bohemian queen")), ["Bohemian Rhapsody"])
+        self.assertEqual(titles(self.index.search("queen bohemian")), ["Bohemian Rhapsody"])
+        self.assertEqual(self.index.search("dandy queen"), [])
+
+    def test_last_word_prefix_is_not_truncated(self):
+        self.assertEqual(titles(self.index.search("queen bo")), ["Bohemian Rhapsody"])
+        self.assertEqual(titles(self.index.search("bohemian r")), ["Bohemian Rhapsody"])
+        self.assertEqual(titles(self.index.search("bohemian q")), ["Bohemian Rhapsody"])
+
+    def test_one_letter_last_word_filters(self):
+        self.assertEqual(titles(self.index.search("queen b")), ["Bohemian Rhapsody"])
+        self.assertEqual(titles(self.index.search("the l")), ["Bohemian Like You", "The Lazy Song"])
+        self.assertEqual(self.index.search("queen z"), [])
+
+    def test_one_letter_query_finds_songs(self):
+        self.assertEqual(len(self.index.search("b")), SearchIndex.CONST_DEFAULT_LIMIT)
+
+    def test_fuzzy_last_word_within_earlier_matches(self):
+        self.assertEqual(titles(self.index.search("queen rhapsodi")), ["Bohemian Rhapsody"])
+
+    def test_limit(self):
+        self.assertEqual(len(self.index.search("born", limit=3)), 3)
+        self.assertEqual(len(self.index.search("band", limit=100)), 60)
+
+    def test_popularity_breaks_ties(self):
+        popularity = Popularity()
+        popularity.windows["all"][1].add(("Bohemian Like You", "The Dandy Warhols"))
+        self.assertEqual(titles(self.index.search("bohemian", popularity=popularity)),
+                         ["Bohemian Like You", "Bohemian Rhapsody"])
+
+    def test_empty_query(self):
+        self.assertEqual(self.index.search("  !! "), [])
+
+    def test_both_ways_of_matching_the_last_word(self):
+        # "queen" leaves two candidates against 120+ "b" postings, so their words are checked directly;
+        # "band born" leaves 60 against a handful of "c" postings, so those postings are walked.
+        self.assertEqual(titles(self.index.search("queen b")), ["Bohemian Rhapsody"])
+        self.assertEqual(titles(self.index.search("band born c", limit=20)),
+                         ["Born c" + letter for letter in "abcdefgh"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from app.controllers.catalog_cache import CatalogCache
+from app.controllers.mongo_controller import MongoController
+from app.controllers.server_controller import ServerController
+from app.models.play_history import PlayHistory
+from app.models.song import Song
+from benchmarks.memory_mongo import MemoryDatabase
+
+
+class ServerControllerTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.mkdtemp()
+        mongo = MongoController(MemoryDatabase())
+        songs = [Song("Song {0}".format(number), "Artist", "link {0}".format(number)) for number in range(3)]
+        for song in songs:
+            mongo.insert_song_obj(song)
+        mongo.save_playlist("fav", songs[:2])
+        cache = CatalogCache(mongo, os.path.join(self.directory, "catalog.sqlite3"))
+        cache.refresh()
+
+        self.controller = ServerController(cache, "127.0.0.1", 0)
+        self.controller.history = PlayHistory(None)
+        self.server = await self.controller.start()
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+        shutil.rmtree(self.directory)
+
+    async def send(self, reader, writer, line):
+        writer.write(line.encode("utf-8") + b"\n")
+        return (await asyncio.wait_for(reader.readuntil(b"> "), 5)).decode("utf-8")
+
+    async def test_load_saved_playlist(self):
+        # saved playlists are resolved on a worker thread, against the snapshot the loop thread opened.
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        try:
+            await asyncio.wait_for(reader.readuntil(b"> "), 5)
+            self.assertIn("fav", await self.send(reader, writer, "5"))
+            output = await self.send(reader, writer, "fav")
+            self.assertIn("Loaded 2 song(s) from 'fav'.", output)
+            self.assertIn("Title: Song 1, Artist: Artist", output)
+        finally:
+            writer.close()
+
+    async def test_sessions_keep_their_own_output(self):
+        first = await asyncio.open_connection("127.0.0.1", self.port)
+        second = await asyncio.open_connection("127.0.0.1", self.port)
+        try:
+            for reader, writer in (first, second):
+                await asyncio.wait_for(reader.readuntil(b"> "), 5)
+            loading, browsing = await asyncio.gather(self.send(*first, "5"), self.send(*second, "1"))
+            self.assertIn("Saved playlists:", loading)
+            self.assertNotIn("Saved playlists:", browsing)
+            self.assertIn("Which song do you want to play:", browsing)
+        finally:
+            first[1].close()
+            second[1].close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from app.models.song_key import canonical_key, clean, fold
+
+
+class SongKeyTest(unittest.TestCase):
+
+    def test_case_and_spacing(self):
+        self.assertEqual(canonical_key("Bohemian Rhapsody", "Queen"),
+                         canonical_key("  bohemian   RHAPSODY ", "QUEEN"))
+
+    def test_accents(self):
+        self.assertEqual(fold("Énergie Café"), "energie cafe")
+        self.assertEqual(canonical_key("Déjà Vu", "Beyoncé"), canonical_key("deja vu", "beyonce"))
+
+    def test_punctuation_and_apostrophes(self):
+        self.assertEqual(clean("Don't Stop Me Now!"), "dont stop me now")
+        self.assertEqual(clean("Don’t Stop Me Now"), "dont stop me now")
+        self.assertEqual(clean("Livin' on a Prayer"), clean("Livin on a Prayer"))
+        self.assertEqual(clean("under_score"), "under score")
+
+    def test_ampersand(self):
+        self.assertEqual(clean("Simon & Garfunkel"), clean("Simon and Garfunkel"))
+
+    def test_featured_artists(self):
+        expected = canonical_key("Despacito", "Luis Fonsi")
+        for title in ("Despacito (feat. Justin Bieber)", "Despacito [ft Justin Bieber]", "Despacito feat. Daddy Yankee",
+                      "Despacito ft. Daddy Yankee", "Despacito featuring Justin Bieber"):
+            self.assertEqual(canonical_key(title, "Luis Fonsi"), expected, title)
+        self.assertEqual(canonical_key("Despacito", "Luis Fonsi feat. Daddy Yankee"), expected)
+
+    def test_feat_inside_a_word_is_kept(self):
+        self.assertEqual(clean("Defeat"), "defeat")
+        self.assertEqual(clean("Feat of Strength"), "feat of strength")
+
+    def test_title_and_artist_stay_apart(self):
+        self.assertNotEqual(canonical_key("a b", "c"), canonical_key("a", "b c"))
+
+
+if __name__ == "__main__":
+    unittest.main()